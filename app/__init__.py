@@ -2,7 +2,11 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from .career_utils import ensure_career_test
+from .career_utils import sync_career_test
+from .cache import init_response_cache
+from .user_cache import init_user_cache, load_cached_user
+from .security import init_security
+from .fragment_cache import init_fragment_cache
 
 db = SQLAlchemy()
 login_manager = LoginManager()
@@ -15,12 +19,21 @@ def create_app(config_class=None):
                 static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
     if config_class is None:
-        from app.config import Config
-        config_class = Config
+        from app.config import CONFIGS
+        config_class = CONFIGS[os.environ.get('APP_CONFIG', 'default')]
     app.config.from_object(config_class)
 
     db.init_app(app)
+    from app.database import init_sqlite_pragmas
+    init_sqlite_pragmas(app)
     login_manager.init_app(app)
+    init_response_cache(app)
+    init_user_cache(app)
+    init_security(app)
+    init_fragment_cache(app)
+
+    from app.metrics import init_metrics
+    init_metrics(app)
 
     from app.auth import auth_bp
     from app.admin import admin_bp
@@ -34,9 +47,14 @@ def create_app(config_class=None):
     app.register_blueprint(main_bp)
     app.register_blueprint(calc_bp, url_prefix='/calc')
 
+    from app.commands import register_commands
+    register_commands(app)
+
     with app.app_context():
+        from app.migrations import upgrade_schema
         db.create_all()
-        ensure_career_test()
+        upgrade_schema()
+        sync_career_test()
 
     return app
 
@@ -44,4 +62,5 @@ from app.models import User
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Пользователь берется из короткоживущего кэша, без запроса к таблице users
+    return load_cached_user(db.session, User, int(user_id))
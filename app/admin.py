@@ -1,7 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify,
+    Response, stream_with_context, current_app,
+)
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
-from app.models import Test, Question, Option
+from app.models import Test, Question, Option, Result, User
+from app.analytics import dashboard_data
+from app.test_io import import_questions, export_questions
+from app.metrics import render_prometheus
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -49,9 +61,26 @@ def admin_test_detail(test_id):
             db.session.commit()
             flash('Вопрос добавлен.', 'success')
             return redirect(url_for('admin.admin_test_detail', test_id=test.id))
-    # Список вопросов этого теста для отображения
-    questions = Question.query.filter_by(test_id=test.id).all()
-    return render_template('admin.html', test=test, questions=questions)
+    # Список вопросов этого теста вместе с вариантами (один запрос IN на все варианты)
+    questions = (
+        Question.query
+        .filter_by(test_id=test.id)
+        .options(selectinload(Question.options))
+        .order_by(Question.id)
+        .all()
+    )
+    option_count = sum(len(q.options) for q in questions)
+    # Результаты выводятся постранично, пользователи подгружаются тем же запросом
+    results = db.paginate(
+        db.select(Result)
+        .where(Result.test_id == test.id)
+        .options(joinedload(Result.user))
+        .order_by(Result.timestamp.desc(), Result.id.desc()),
+        per_page=current_app.config['ADMIN_RESULTS_PER_PAGE'],
+        max_per_page=current_app.config['ADMIN_RESULTS_PER_PAGE'],
+    )
+    return render_template('admin.html', test=test, questions=questions,
+                           option_count=option_count, results=results)
 
 @admin_bp.route('/question/<int:question_id>/add_option', methods=['POST'])
 @login_required
@@ -104,3 +133,169 @@ def admin_delete_option(option_id):
     db.session.commit()
     flash('Вариант ответа удалён.', 'info')
     return redirect(url_for('admin.admin_test_detail', test_id=test_id))
+
+
+def _date_range():
+    """Период отчёта из параметров ``from`` и ``to`` (YYYY-MM-DD)."""
+    try:
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        abort(400)
+    return date_from, date_to
+
+@admin_bp.route('/analytics')
+@login_required
+def admin_analytics():
+    """Панель аналитики по результатам профориентационного теста."""
+    date_from, date_to = _date_range()
+    data = dashboard_data(date_from, date_to)
+    return render_template('analytics.html', data=data, date_from=date_from, date_to=date_to)
+
+@admin_bp.route('/analytics/data')
+@login_required
+def admin_analytics_data():
+    """Данные панели аналитики в формате JSON."""
+    return jsonify(dashboard_data(*_date_range()))
+
+
+EXPORT_COLUMNS = (
+    'result_id', 'user_id', 'username', 'email', 'last_name', 'first_name', 'middle_name',
+    'timestamp', 'recommended_direction', 'result_text',
+)
+EXPORT_CHUNK = 1000
+
+def _export_rows(test_id, date_from, date_to):
+    """Строки выгрузки: результаты теста вместе с данными пользователя, порциями."""
+    query = (
+        db.select(
+            Result.id, Result.user_id, User.username, User.email, User.last_name,
+            User.first_name, User.middle_name, Result.timestamp,
+            Result.recommended_direction, Result.result_text,
+        )
+        .join(User, Result.user_id == User.id)
+        .where(Result.test_id == test_id)
+        .order_by(Result.id)
+        .execution_options(yield_per=EXPORT_CHUNK)
+    )
+    if date_from is not None:
+        query = query.where(Result.timestamp >= date_from)
+    if date_to is not None:
+        query = query.where(Result.timestamp < date_to + timedelta(days=1))
+    for partition in db.session.execute(query).partitions():
+        yield partition
+
+def _export_csv(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in partitions:
+        for row in rows:
+            writer.writerow([*row[:7], row.timestamp.isoformat(sep=' '), *row[8:]])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def _export_ndjson(partitions):
+    for rows in partitions:
+        lines = []
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record['timestamp'] = row.timestamp.isoformat(sep=' ')
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        yield ''.join(lines)
+
+@admin_bp.route('/test/<int:test_id>/export')
+@login_required
+def admin_export_results(test_id):
+    """Потоковая выгрузка результатов теста в CSV или NDJSON.
+
+    Параметры: ``format`` (csv или ndjson), ``from`` и ``to`` (YYYY-MM-DD,
+    включительно). Строки читаются порциями и сразу отправляются клиенту,
+    поэтому память не зависит от количества результатов.
+    """
+    test = Test.query.get_or_404(test_id)
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        abort(400)
+    date_from, date_to = _date_range()
+    partitions = _export_rows(test.id, date_from, date_to)
+    if export_format == 'csv':
+        body, mimetype = _export_csv(partitions), 'text/csv'
+    else:
+        body, mimetype = _export_ndjson(partitions), 'application/x-ndjson'
+    filename = f'test_{test.id}_results.{export_format}'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
+
+@admin_bp.route('/test/import', methods=['POST'])
+@login_required
+def admin_import_test():
+    """Импорт теста целиком (вопросы, варианты, веса) из JSON одной транзакцией.
+
+    Принимает JSON ``{"title", "description", "type", "questions"}`` в теле
+    запроса либо форму с полями ``title``, ``description``, ``type`` и
+    файлом ``file`` (список вопросов в формате docs/career_test_structure.md).
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "JSON object expected"}), 400
+        title = payload.get('title')
+        description = payload.get('description')
+        test_type = payload.get('type') or 'career'
+        questions = payload.get('questions')
+    else:
+        title = request.form.get('title')
+        description = request.form.get('description')
+        test_type = request.form.get('type') or 'career'
+        upload = request.files.get('file')
+        try:
+            questions = json.load(upload.stream) if upload else None
+        except ValueError:
+            questions = None
+
+    error = None
+    if not title:
+        error = 'Название теста обязательно.'
+    else:
+        try:
+            test = import_questions(questions, title=title, description=description, test_type=test_type)
+        except ValueError as exc:
+            db.session.rollback()
+            error = f'Ошибка в документе: {exc}'
+    if error:
+        if request.is_json:
+            return jsonify({"error": error}), 400
+        flash(error, 'danger')
+        return redirect(url_for('admin.admin_index'))
+
+    db.session.commit()
+    if request.is_json:
+        return jsonify({"id": test.id, "questions": len(questions)}), 201
+    flash(f'Тест "{title}" импортирован.', 'success')
+    return redirect(url_for('admin.admin_test_detail', test_id=test.id))
+
+@admin_bp.route('/test/<int:test_id>/definition')
+@login_required
+def admin_export_test(test_id):
+    """Экспорт вопросов теста в JSON (формат импорта)."""
+    test = Test.query.get_or_404(test_id)
+    response = jsonify(export_questions(test.id))
+    response.headers['Content-Disposition'] = f'attachment; filename=test_{test.id}.json'
+    return response
+
+
+@admin_bp.route('/metrics')
+@login_required
+def admin_metrics():
+    """Метрики запросов в текстовом формате Prometheus (если сбор включен)."""
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+    return Response(render_prometheus(registry), mimetype='text/plain; version=0.0.4')
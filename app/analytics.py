@@ -0,0 +1,246 @@
+"""Daily rollups of career test results for the admin dashboard.
+
+The ``stat_*`` tables are updated in the same transaction that stores new
+career results (see ``career_store.save_career_results``), so the
+dashboard reads a few small aggregate rows instead of scanning every
+``Result``. :func:`rebuild_rollups` recomputes everything from the stored
+results in a single transaction.
+"""
+from collections import Counter
+
+import numpy as np
+
+from app import db
+from app.models import (
+    Result,
+    Test,
+    User,
+    Direction,
+    CareerScore,
+    CareerDailyStat,
+    DirectionDailyStat,
+    DirectionScoreBucket,
+    ProgramDailyStat,
+)
+from .calc import PROGRAM_TABLE
+from .database import UPSERT_DIALECTS, get_direction_ids
+from .ege_engine import PROGRAM_MATRIX, scores_to_matrix
+
+SCORE_BUCKET_WIDTH = 10
+
+
+def _increment(model, rows):
+    """Add counters in ``rows`` to existing rollup rows, inserting new keys."""
+    if not rows:
+        return
+    keys = [col.name for col in model.__table__.primary_key.columns]
+    counters = [name for name in rows[0] if name not in keys]
+    insert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters},
+        )
+        db.session.execute(stmt, rows)
+        return
+    # Другие СУБД: обновляем построчно, добавляя отсутствующие ключи
+    for row in rows:
+        key = {name: row[name] for name in keys}
+        updated = db.session.execute(
+            db.update(model)
+            .filter_by(**key)
+            .values({name: getattr(model, name) + row[name] for name in counters})
+        ).rowcount
+        if not updated:
+            db.session.execute(db.insert(model), [row])
+
+
+def record_career_results(entries):
+    """Update rollups for newly stored career results.
+
+    Parameters
+    ----------
+    entries : list
+        Dicts with ``day`` (date), ``scores`` (list of (direction, score)),
+        ``recommended`` and optionally ``ege`` (mapping subject -> points).
+    """
+    if not entries:
+        return
+    direction_ids = get_direction_ids(
+        direction for entry in entries for direction, _ in entry["scores"]
+    )
+    daily = Counter()
+    directions = {}
+    buckets = Counter()
+    for entry in entries:
+        day = entry["day"]
+        daily[day] += 1
+        for direction, score in entry["scores"]:
+            key = (day, direction_ids[direction])
+            stat = directions.setdefault(key, {"results": 0, "score_sum": 0, "recommended": 0})
+            stat["results"] += 1
+            stat["score_sum"] += score
+            if direction == entry["recommended"]:
+                stat["recommended"] += 1
+            buckets[key + (score // SCORE_BUCKET_WIDTH * SCORE_BUCKET_WIDTH,)] += 1
+
+    programs = {}
+    eligible = PROGRAM_MATRIX.evaluate(
+        scores_to_matrix([entry.get("ege") or {} for entry in entries])
+    )["eligible"]
+    days = np.array([entry["day"] for entry in entries], dtype=object)
+    for day in daily:
+        counts = eligible[days == day].sum(axis=0)
+        for prog, count in zip(PROGRAM_TABLE, counts):
+            programs[(day, prog.row['code'])] = {"checked": daily[day], "eligible": int(count)}
+
+    _increment(CareerDailyStat, [{"day": day, "results": n} for day, n in daily.items()])
+    _increment(DirectionDailyStat, [
+        {"day": day, "direction_id": direction_id, **stat}
+        for (day, direction_id), stat in directions.items()
+    ])
+    _increment(DirectionScoreBucket, [
+        {"day": day, "direction_id": direction_id, "bucket": bucket, "count": n}
+        for (day, direction_id, bucket), n in buckets.items()
+    ])
+    _increment(ProgramDailyStat, [
+        {"day": day, "program_code": code, **stat}
+        for (day, code), stat in programs.items()
+    ])
+
+
+def rebuild_rollups(chunk_size=1000):
+    """Recompute all rollups from stored career results.
+
+    Results are read in primary key order, ``chunk_size`` at a time, together
+    with their structured scores (run ``backfill-career-scores`` first for
+    old results). Eligibility uses the users' current EGE scores because the
+    scores at submission time are not stored. Returns the number of results.
+
+    The old rows are deleted and the new ones written in one transaction, so
+    readers keep seeing the previous totals until it commits. Concurrent
+    increments wait for the rebuild: SQLite holds the write lock from the
+    first delete, PostgreSQL gets an explicit table lock. Otherwise a result
+    saved mid-rebuild could be counted both by its own increment and by a
+    later chunk.
+    """
+    models = (CareerDailyStat, DirectionDailyStat, DirectionScoreBucket, ProgramDailyStat)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        tables = ', '.join(model.__tablename__ for model in models)
+        db.session.execute(db.text(f'LOCK TABLE {tables} IN EXCLUSIVE MODE'))
+    for model in models:
+        db.session.execute(db.delete(model))
+
+    base = (
+        db.select(Result.id, Result.timestamp, Result.recommended_direction,
+                  User.ege_math, User.ege_russian, User.ege_physics)
+        .join(Test, Result.test_id == Test.id)
+        .join(User, Result.user_id == User.id)
+        .where(Test.type == 'career')
+        .order_by(Result.id)
+        .limit(chunk_size)
+    )
+    total = 0
+    last_id = 0
+    while True:
+        chunk = db.session.execute(base.where(Result.id > last_id)).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        scores = {}
+        for result_id, name, score in db.session.execute(
+            db.select(CareerScore.result_id, Direction.name, CareerScore.score)
+            .join(Direction, CareerScore.direction_id == Direction.id)
+            .where(CareerScore.result_id.in_([row.id for row in chunk]))
+        ):
+            scores.setdefault(result_id, []).append((name, score))
+        record_career_results([
+            {
+                "day": row.timestamp.date(),
+                "scores": scores.get(row.id, []),
+                "recommended": row.recommended_direction,
+                "ege": {"math": row.ege_math, "russian": row.ege_russian, "physics": row.ege_physics},
+            }
+            for row in chunk
+        ])
+        total += len(chunk)
+    db.session.commit()
+    return total
+
+
+def dashboard_data(date_from=None, date_to=None):
+    """Aggregate rollups over an inclusive date range for the dashboard."""
+    def in_range(model, query):
+        if date_from is not None:
+            query = query.where(model.day >= date_from)
+        if date_to is not None:
+            query = query.where(model.day <= date_to)
+        return query
+
+    daily = db.session.execute(in_range(
+        CareerDailyStat,
+        db.select(CareerDailyStat.day, CareerDailyStat.results).order_by(CareerDailyStat.day),
+    )).all()
+    total = sum(row.results for row in daily)
+
+    directions = []
+    for name, results, score_sum, recommended in db.session.execute(in_range(
+        DirectionDailyStat,
+        db.select(
+            Direction.name,
+            db.func.sum(DirectionDailyStat.results),
+            db.func.sum(DirectionDailyStat.score_sum),
+            db.func.sum(DirectionDailyStat.recommended),
+        )
+        .join(Direction, DirectionDailyStat.direction_id == Direction.id)
+        .group_by(Direction.name)
+        .order_by(db.func.sum(DirectionDailyStat.recommended).desc(), Direction.name),
+    )):
+        directions.append({
+            "name": name,
+            "results": results,
+            "recommended": recommended,
+            "recommendation_rate": round(recommended / total, 4) if total else 0,
+            "average_score": round(score_sum / results, 2) if results else 0,
+            "histogram": {},
+        })
+
+    by_name = {d["name"]: d for d in directions}
+    for name, bucket, count in db.session.execute(in_range(
+        DirectionScoreBucket,
+        db.select(Direction.name, DirectionScoreBucket.bucket, db.func.sum(DirectionScoreBucket.count))
+        .join(Direction, DirectionScoreBucket.direction_id == Direction.id)
+        .group_by(Direction.name, DirectionScoreBucket.bucket)
+        .order_by(DirectionScoreBucket.bucket),
+    )):
+        by_name[name]["histogram"][bucket] = count
+
+    program_stats = {
+        code: (checked, eligible)
+        for code, checked, eligible in db.session.execute(in_range(
+            ProgramDailyStat,
+            db.select(
+                ProgramDailyStat.program_code,
+                db.func.sum(ProgramDailyStat.checked),
+                db.func.sum(ProgramDailyStat.eligible),
+            ).group_by(ProgramDailyStat.program_code),
+        ))
+    }
+    programs = []
+    for prog in PROGRAM_TABLE:
+        checked, eligible = program_stats.get(prog.row['code'], (0, 0))
+        programs.append({
+            "code": prog.row['code'],
+            "name": prog.row['name'],
+            "checked": checked,
+            "eligible": eligible,
+            "eligibility_rate": round(eligible / checked, 4) if checked else 0,
+        })
+
+    return {
+        "total_results": total,
+        "daily": [{"day": row.day.isoformat(), "results": row.results} for row in daily],
+        "directions": directions,
+        "programs": programs,
+    }
@@ -1,11 +1,57 @@
-from flask import Blueprint, jsonify
-from app.models import User, Test
+import base64
+import hashlib
+import math
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, abort, current_app, json as flask_json
+from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import User, Test, Question, Result
+from .cache import get_response_cache
+from .career_store import save_career_results
+from .calc import (
+    SUBJECT_MAP, SUBJECT_NAMES, PROGRAM_INDEX, PROGRAM_TABLE, PROGRAM_TABLE_VERSION,
+    PROBABILITY_OFFSET, PROBABILITY_WIDTH, PROBABILITY_HIGH, PROBABILITY_MEDIUM,
+)
+from .ege_engine import SUBJECTS, PROGRAM_MATRIX, scores_to_matrix
+from .career_utils import get_structure, get_career_questions, score_batch, ensure_career_test
 
 api_bp = Blueprint('api', __name__)
 
+
+def cached_json(key, build):
+    """Ответ JSON из кэша с поддержкой ETag / If-None-Match.
+
+    ``build`` вызывается только при промахе и должен вернуть данные для
+    сериализации.
+    """
+    cache = get_response_cache()
+    entry = cache.get(key)
+    if entry is None:
+        version = cache.version
+        body = flask_json.dumps(build()).encode('utf-8')
+        entry = cache.set(key, body, version)
+    return etag_response(*entry)
+
+
+def etag_response(body, etag):
+    """Ответ JSON с ETag; 304 без тела, если у клиента та же версия."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+
 @api_bp.route('/tests', methods=['GET'])
 def api_get_tests():
     """API эндпоинт: получить список всех тестов."""
+    return cached_json('tests', _tests_data)
+
+
+def _tests_data():
     tests = Test.query.all()
     tests_data = []
     for test in tests:
@@ -15,12 +61,22 @@ def api_get_tests():
             "description": test.description or "",
             "type": test.type or ""
         })
-    return jsonify({"tests": tests_data})
+    return {"tests": tests_data}
 
 @api_bp.route('/tests/<int:test_id>', methods=['GET'])
 def api_get_test_detail(test_id):
     """API эндпоинт: получить детали теста (вопросы и варианты)."""
-    test = Test.query.get_or_404(test_id)
+    return cached_json(('test', test_id), lambda: _test_detail_data(test_id))
+
+
+def _test_detail_data(test_id):
+    # Вопросы и варианты подгружаются двумя запросами IN вместо N+1 ленивых загрузок
+    test = (
+        Test.query
+        .options(selectinload(Test.questions).selectinload(Question.options))
+        .filter_by(id=test_id)
+        .first_or_404()
+    )
     test_data = {
         "id": test.id,
         "title": test.title,
@@ -38,18 +94,280 @@ def api_get_test_detail(test_id):
                 "category": opt.category or ""
             })
         test_data["questions"].append(q_data)
-    return jsonify(test_data)
+    return test_data
+
+def encode_cursor(timestamp, result_id):
+    """Непрозрачный курсор страницы: позиция последней выданной строки."""
+    raw = f"{timestamp.isoformat()}|{result_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, result_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(timestamp), int(result_id)
+
 
 @api_bp.route('/user/<int:user_id>/results', methods=['GET'])
 def api_get_user_results(user_id):
-    """API эндпоинт: получить результаты всех тестов для указанного пользователя."""
+    """API эндпоинт: результаты тестов пользователя, от новых к старым.
+
+    Постраничная выдача по ключу (timestamp, id): параметр ``limit`` задаёт
+    размер страницы, ``cursor`` — значение ``next_cursor`` из предыдущего
+    ответа.
+    """
     user = User.query.get_or_404(user_id)
+    config = current_app.config
+    try:
+        limit = int(request.args.get('limit', config['RESULTS_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    limit = max(1, min(limit, config['RESULTS_PAGE_SIZE_MAX']))
+
+    query = (
+        db.select(Result.id, Result.test_id, Test.title, Result.result_text, Result.timestamp)
+        .join(Test, Result.test_id == Test.id)
+        .where(Result.user_id == user.id)
+        .order_by(Result.timestamp.desc(), Result.id.desc())
+        .limit(limit + 1)
+    )
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after_ts, after_id = decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": "invalid cursor"}), 400
+        query = query.where(
+            (Result.timestamp < after_ts)
+            | ((Result.timestamp == after_ts) & (Result.id < after_id))
+        )
+
+    rows = db.session.execute(query).all()
+    page = rows[:limit]
     results_data = []
-    for res in user.results:
+    for row in page:
         results_data.append({
-            "test_id": res.test_id,
-            "test_title": res.test.title,
-            "result": res.result_text,
-            "timestamp": res.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+            "test_id": row.test_id,
+            "test_title": row.title,
+            "result": row.result_text,
+            "timestamp": row.timestamp.strftime("%Y-%m-%d %H:%M:%S")
         })
-    return jsonify({"user": user.username, "results": results_data})
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].timestamp, page[-1].id)
+    return jsonify({"user": user.username, "results": results_data, "next_cursor": next_cursor})
+
+@api_bp.route('/career/score_batch', methods=['POST'])
+@login_required
+def api_career_score_batch():
+    """API эндпоинт: пакетная обработка бланков профориентационного теста.
+
+    Принимает JSON вида ``{"submissions": [{"answers": ..., "ege": {...},
+    "user_id": ...}], "save": true}``. Ответы задаются списком индексов
+    вариантов в порядке вопросов либо словарём id вопроса -> индекс.
+    При ``save`` результаты с указанным ``user_id`` сохраняются одной
+    пакетной вставкой.
+    """
+    if not current_user.is_admin:
+        abort(403)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "JSON object expected"}), 400
+    submissions = payload.get('submissions')
+    if not isinstance(submissions, list):
+        return jsonify({"error": "submissions must be a list"}), 400
+
+    answer_sheets = []
+    ege_scores = []
+    for i, sub in enumerate(submissions):
+        answers = sub.get('answers') if isinstance(sub, dict) else None
+        user_id = sub.get('user_id') if isinstance(sub, dict) else None
+        if user_id is not None and type(user_id) is not int:
+            return jsonify({"error": f"invalid user_id in submission {i}"}), 400
+        try:
+            if isinstance(answers, dict):
+                answers = {int(k): int(v) for k, v in answers.items()}
+            elif isinstance(answers, list):
+                answers = [int(v) for v in answers]
+            else:
+                raise ValueError
+            ege = sub.get('ege') or {}
+            if not isinstance(ege, dict):
+                raise ValueError
+            ege = {k: int(v) for k, v in ege.items()}
+        except (TypeError, ValueError):
+            return jsonify({"error": f"invalid submission {i}"}), 400
+        answer_sheets.append(answers)
+        ege_scores.append(ege)
+
+    _, programs = get_structure()
+    _, compiled = get_career_questions(ensure_career_test())
+    try:
+        scored = score_batch(compiled, programs, answer_sheets, ege_scores)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    saved = 0
+    if payload.get('save'):
+        user_ids = {sub.get('user_id') for sub in submissions if sub.get('user_id') is not None}
+        known = set(db.session.scalars(db.select(User.id).where(User.id.in_(user_ids))))
+        unknown = sorted(str(uid) for uid in user_ids - known)
+        if unknown:
+            return jsonify({"error": f"unknown user_id: {', '.join(unknown)}"}), 400
+        test_id = ensure_career_test().id
+        entries = [
+            {"user_id": sub['user_id'], "test_id": test_id, "ege": ege, **data}
+            for sub, ege, data in zip(submissions, ege_scores, scored)
+            if sub.get('user_id') is not None
+        ]
+        if entries:
+            save_career_results(entries)
+            db.session.commit()
+        saved = len(entries)
+
+    return jsonify({"results": scored, "saved": saved})
+
+
+def query_scores(args):
+    """Баллы из параметров запроса: строки из цифр превращаются в числа,
+    остальное оставляется как есть и отклоняется в :func:`parse_scores`."""
+    return {name: int(value) if value.isascii() and value.isdigit() else value for name, value in args.items()}
+
+
+def parse_scores(given):
+    """Проверяет баллы ЕГЭ и дополняет отсутствующие предметы нулями.
+
+    Допускаются только известные предметы и целые числа от 0 до 100
+    (``bool`` и дробные числа отклоняются). При ошибке — ``ValueError``.
+    """
+    unknown = set(given) - set(SUBJECTS)
+    if unknown:
+        raise ValueError(f"unknown subjects: {', '.join(sorted(unknown))}")
+    scores = dict.fromkeys(SUBJECTS, 0)
+    for name, value in given.items():
+        if type(value) is not int:
+            raise ValueError(f"{name}: integer score expected")
+        if not 0 <= value <= 100:
+            raise ValueError("scores must be between 0 and 100")
+        scores[name] = value
+    return scores
+
+
+@api_bp.route('/programs/reachable', methods=['GET'])
+def api_programs_reachable():
+    """API эндпоинт: лучшие K программ, доступных с указанными баллами ЕГЭ.
+
+    Баллы передаются параметрами ``math``, ``russian`` и т.д.; также
+    поддерживаются ``k``, ``sort`` (margin, probability, cost),
+    ``max_cost``, ``min_budget`` и ``subjects`` (список через запятую).
+    """
+    args = request.args
+    try:
+        scores = parse_scores(query_scores({name: args[name] for name in SUBJECTS if name in args}))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    try:
+        k = max(1, min(100, int(args.get('k', 10))))
+        max_cost = int(args['max_cost']) if args.get('max_cost') else None
+        min_budget = int(args['min_budget']) if args.get('min_budget') else None
+    except ValueError:
+        return jsonify({"error": "numeric parameters expected"}), 400
+    subjects = None
+    if args.get('subjects'):
+        subjects = {s.strip() for s in args['subjects'].split(',') if s.strip()}
+        unknown = subjects - set(SUBJECT_MAP.values())
+        if unknown:
+            return jsonify({"error": f"unknown subjects: {', '.join(sorted(unknown))}"}), 400
+    try:
+        programs = PROGRAM_INDEX.reachable(
+            scores, k=k, sort=args.get('sort', 'margin'),
+            max_cost=max_cost, min_budget=min_budget, subjects=subjects,
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"programs": programs})
+
+
+# Каталог программ не меняется во время работы процесса: тело ответа
+# /calc/programs собирается один раз
+PROGRAMS_MAX_AGE = 24 * 3600
+_programs_response = None
+
+
+def _calc_programs_body():
+    global _programs_response
+    if _programs_response is None:
+        fields = ('code', 'name', 'subjects_full', 'cost', 'cost_display',
+                  'budget_total', 'paid_ru', 'paid_int')
+        programs = [
+            {**{name: prog.row[name] for name in fields}, 'score_2024': prog.needed, 'groups': groups}
+            for prog, groups in zip(PROGRAM_TABLE, PROGRAM_MATRIX.program_groups())
+        ]
+        body = flask_json.dumps({
+            'version': PROGRAM_TABLE_VERSION,
+            'subjects': [{'key': key, 'name': SUBJECT_NAMES[key]} for key in SUBJECTS],
+            'groups': PROGRAM_MATRIX.group_subjects(),
+            # Шанс = clip(round((балл - проходной + offset) / width * 100, 1), 0, 100);
+            # high/medium — пороги цвета индикатора
+            'probability': {
+                'offset': PROBABILITY_OFFSET,
+                'width': PROBABILITY_WIDTH,
+                'high': PROBABILITY_HIGH,
+                'medium': PROBABILITY_MEDIUM,
+            },
+            'programs': programs,
+        }).encode('utf-8')
+        _programs_response = (body, hashlib.sha1(body).hexdigest())
+    return _programs_response
+
+
+@api_bp.route('/calc/programs', methods=['GET'])
+def api_calc_programs():
+    """API эндпоинт: каталог программ для расчета баллов на стороне клиента.
+
+    Группы предметов заданы индексами в списке ``subjects``, у программы —
+    индексами в списке ``groups``. Балл программы — сумма максимумов по её
+    группам.
+    """
+    response = etag_response(*_calc_programs_body())
+    response.cache_control.public = True
+    response.cache_control.max_age = PROGRAMS_MAX_AGE
+    return response
+
+
+@api_bp.route('/calc/score', methods=['GET', 'POST'])
+def api_calc_score():
+    """API эндпоинт: баллы, проходимость и шанс по всем программам.
+
+    Баллы передаются параметрами запроса (``math=80&russian=75``), объектом
+    JSON ``{"scores": {...}}`` или вектором ``{"vector": [...]}`` в порядке
+    ``subjects`` из ``/api/calc/programs``. Массивы ответа идут в порядке
+    программ каталога версии ``version``.
+    """
+    try:
+        if request.method == 'GET':
+            scores = parse_scores(query_scores(request.args))
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                raise ValueError("JSON object expected")
+            if 'vector' in data:
+                vector = data['vector']
+                if not isinstance(vector, list) or len(vector) != len(SUBJECTS):
+                    raise ValueError(f"vector must have {len(SUBJECTS)} items")
+                scores = parse_scores(dict(zip(SUBJECTS, vector)))
+            else:
+                given = data.get('scores', {})
+                if not isinstance(given, dict):
+                    raise ValueError("scores must be an object")
+                scores = parse_scores(given)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    result = PROGRAM_MATRIX.evaluate(scores_to_matrix([scores]))
+    return jsonify({
+        "version": PROGRAM_TABLE_VERSION,
+        "totals": [int(v) for v in result["totals"][0]],
+        "eligible": result["eligible"][0].tolist(),
+        "probability": [None if math.isnan(v) else v for v in result["probability"][0].tolist()],
+    })
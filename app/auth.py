@@ -1,11 +1,19 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+import math
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
+
 from app import db
 from app.models import User
+from app.security import HashingBusy, get_login_limiter, login_keys, needs_rehash
 from datetime import datetime  # <== Добавь сюда!
 
 auth_bp = Blueprint('auth', __name__)
 
+# Ключ advisory-блокировки PostgreSQL для выбора первого администратора
+FIRST_ADMIN_LOCK = 0x61646D6E
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     """Маршрут регистрации нового пользователя."""
@@ -31,7 +39,12 @@ def register():
         elif password != confirm:
             flash('Пароли не совпадают. Попробуйте еще раз.', 'danger')
             return redirect(url_for('auth.register'))
-        elif User.query.filter((User.username == username) | (User.email == email)).first():
+        elif db.session.scalar(
+            db.select(User.id).where(
+                (db.func.lower(User.username) == db.func.lower(username))
+                | (db.func.lower(User.email) == db.func.lower(email))
+            ).limit(1)
+        ) is not None:
             flash('Пользователь с таким именем или email уже существует.', 'danger')
             return redirect(url_for('auth.register'))
 
@@ -52,7 +65,13 @@ def register():
             first_name=first_name,
             middle_name=middle_name,
         )
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusy:
+            flash('Сервер перегружен. Повторите попытку через несколько секунд.', 'warning')
+            response = make_response(render_template('register.html'), 503)
+            response.headers['Retry-After'] = '5'
+            return response
 
         # Если студент — сохраняем баллы
         if is_student:
@@ -60,12 +79,25 @@ def register():
             user.ege_russian = request.form.get('ege_russian') or None
             user.ege_physics = request.form.get('ege_physics') or None
 
-        # Если это первый пользователь, делаем его администратором
-        if User.query.first() is None:
-            user.is_admin = True
+        # Первый пользователь становится администратором. Условие вычисляется
+        # самим INSERT. В SQLite записи идут строго по очереди, поэтому две
+        # одновременные регистрации не станут обе админами. В PostgreSQL
+        # NOT EXISTS не видит чужих незафиксированных строк: пока таблица пуста,
+        # регистрации сериализуются транзакционной advisory-блокировкой.
+        # Для других СУБД гарантии нет.
+        user.is_admin = ~db.select(User.id).exists()
+        if (db.session.get_bind().dialect.name == 'postgresql'
+                and db.session.scalar(db.select(User.id).limit(1)) is None):
+            db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': FIRST_ADMIN_LOCK})
 
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Имя или email (без учета регистра) заняли параллельной регистрацией
+            db.session.rollback()
+            flash('Пользователь с таким именем или email уже существует.', 'danger')
+            return redirect(url_for('auth.register'))
 
         login_user(user)
         flash('Регистрация успешно завершена!', 'success')
@@ -83,13 +115,49 @@ def login():
     if request.method == 'POST':
         login_field = request.form.get('username')  # Логин или email
         password = request.form.get('password')
-        user = User.query.filter_by(username=login_field).first() or User.query.filter_by(email=login_field).first()
-        if user and user.check_password(password):
+
+        # Ограничение неудачных попыток проверяется до дорогого хеширования
+        limiter = get_login_limiter()
+        keys = login_keys(request.remote_addr, login_field)
+        retry_after = limiter.retry_after(keys)
+        if retry_after:
+            flash('Слишком много неудачных попыток входа. Попробуйте позже.', 'danger')
+            response = make_response(render_template('login.html'), 429)
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response
+
+        # Один запрос по имени или email без учета регистра; совпадение по имени важнее
+        login_lower = db.func.lower(login_field or '')
+        username_match = db.func.lower(User.username) == login_lower
+        user = db.session.scalars(
+            db.select(User)
+            .where(username_match | (db.func.lower(User.email) == login_lower))
+            .order_by(db.case((username_match, 0), else_=1), User.id)
+            .limit(1)
+        ).first()
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('Сервер перегружен. Повторите попытку через несколько секунд.', 'warning')
+            response = make_response(render_template('login.html'), 503)
+            response.headers['Retry-After'] = '5'
+            return response
+
+        if valid:
+            # Хеш, созданный с прежними параметрами, пересчитывается прозрачно.
+            # Если пул хеширования занят, пересчет откладывается до следующего входа
+            if needs_rehash(user.password_hash):
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass
             login_user(user)
             flash(f'Добро пожаловать, {user.full_name or user.username}!', 'success')
             next_page = request.args.get('next')
             return redirect(next_page or url_for('main.index'))
         else:
+            limiter.fail(keys)
             flash('Неверные имя пользователя/email или пароль.', 'danger')
     
     return render_template('login.html')
@@ -0,0 +1,106 @@
+"""In-process cache of serialized API responses for test definitions.
+
+Entries are keyed by an arbitrary hashable key (``'tests'``,
+``('test', test_id)``) and belong to a content version. Any committed
+change to ``Test``, ``Question`` or ``Option`` rows bumps the version and
+drops all entries, so the admin handlers never have to remember to
+invalidate anything. Bulk Core statements bypass the ORM unit of work and
+must call :func:`invalidate_response_cache` themselves.
+
+The cache lives in each process; with several workers every process keeps
+and invalidates its own copy.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ResponseCache:
+    """Bounded LRU mapping key -> (body, etag) tied to a content version."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, version):
+        """Store ``body`` (bytes) and return the ``(body, etag)`` pair.
+
+        ``version`` is the value of :attr:`version` read before the body was
+        built; if the content changed meanwhile the body is not stored.
+        """
+        etag = hashlib.sha1(body).hexdigest()
+        entry = (body, etag)
+        if self.maxsize <= 0:
+            return entry
+        with self._lock:
+            if version != self.version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_response_cache(app=None):
+    app = app or current_app
+    return app.extensions['response_cache']
+
+
+def invalidate_response_cache():
+    """Drop cached test responses of the current application."""
+    if has_app_context() and 'response_cache' in current_app.extensions:
+        get_response_cache().invalidate()
+
+
+def _touches_tests(session):
+    from app.models import Test, Question, Option
+
+    tracked = (Test, Question, Option)
+    return any(
+        isinstance(obj, tracked)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_tests_changed(session, flush_context):
+    if _touches_tests(session):
+        session.info['tests_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('tests_changed', False):
+        invalidate_response_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('tests_changed', None)
+
+
+def init_response_cache(app):
+    app.extensions['response_cache'] = ResponseCache(app.config.get('API_CACHE_SIZE', 256))
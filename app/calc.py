@@ -1,3 +1,10 @@
+import hashlib
+import heapq
+import json
+from bisect import bisect_right
+from types import MappingProxyType
+from typing import NamedTuple
+
 from flask import Blueprint, render_template, request
 from flask_login import login_required, current_user
 
@@ -54,6 +61,148 @@ def calc_program_score(groups, scores):
         total += max(scores.get(o, 0) for o in opts)
     return total
 
+# Шанс поступления = clip(round((балл - проходной + OFFSET) / WIDTH * 100, 1), 0, 100):
+# при балле на OFFSET ниже проходного шанс 0, на WIDTH - OFFSET выше — 100
+PROBABILITY_OFFSET = 30
+PROBABILITY_WIDTH = 60
+# Пороги цвета индикатора (в процентах): зеленый и желтый
+PROBABILITY_HIGH = 60
+PROBABILITY_MEDIUM = 30
+
+
+def admission_probability(user_score, needed):
+    """Вероятность поступления (в процентах) и цвет индикатора для шаблона."""
+    if needed is None:
+        return None, None
+    probability = max(0, min(100, round(
+        (user_score - needed + PROBABILITY_OFFSET) / PROBABILITY_WIDTH * 100, 1)))
+    if probability >= PROBABILITY_HIGH:
+        prob_color = 'bg-success'
+    elif probability >= PROBABILITY_MEDIUM:
+        prob_color = 'bg-warning'
+    else:
+        prob_color = 'bg-danger'
+    return probability, prob_color
+
+
+class CompiledProgram(NamedTuple):
+    """Программа из EGE_PROGRAMS с заранее разобранными предметами.
+
+    ``row`` — неизменяемый словарь с исходными полями программы и готовыми
+    строками для отображения (``subjects_full``, ``cost_display``).
+    """
+    row: MappingProxyType
+    groups: tuple
+    needed: object
+
+
+def compile_programs(programs):
+    """Собрать неизменяемую таблицу программ: всё, что не зависит от пользователя."""
+    table = []
+    for p in programs:
+        row = {
+            **p,
+            'subjects_full': full_subjects(p['subjects']),
+            'cost_display': f"{p['cost']:,}".replace(',', ' ') + ' руб/сем',
+        }
+        groups = tuple(tuple(opts) for opts in parse_subjects(p['subjects']))
+        table.append(CompiledProgram(MappingProxyType(row), groups, p['score_2024']))
+    return tuple(table)
+
+
+PROGRAM_TABLE = compile_programs(EGE_PROGRAMS)
+# Версия каталога для ключей кэша фрагментов шаблона
+PROGRAM_TABLE_VERSION = hashlib.sha1(
+    json.dumps(EGE_PROGRAMS, ensure_ascii=False, sort_keys=True).encode()
+).hexdigest()[:12]
+
+class ProgramIndex:
+    """Индекс программ для запросов «какие программы мне доступны».
+
+    Программы с известным проходным баллом сгруппированы по сигнатуре
+    предметов (набору групп) и внутри группы отсортированы по баллу 2024.
+    Балл абитуриента считается один раз на сигнатуру, а доступные программы
+    находятся бинарным поиском, поэтому запрос не перебирает весь каталог.
+    """
+
+    SORT_KEYS = {
+        'margin': (lambda item: item['margin'], True),
+        'probability': (lambda item: (item['probability'], item['margin']), True),
+        'cost': (lambda item: item['cost'], False),
+    }
+
+    def __init__(self, table=PROGRAM_TABLE):
+        buckets = {}
+        for prog in table:
+            if prog.needed is None:
+                continue
+            signature = tuple(frozenset(opts) for opts in prog.groups)
+            buckets.setdefault(signature, (prog.groups, []))[1].append(prog)
+        self.buckets = []
+        for groups, progs in buckets.values():
+            progs.sort(key=lambda prog: prog.needed)
+            self.buckets.append((groups, [prog.needed for prog in progs], progs))
+
+    def reachable(self, scores, k=10, sort='margin', max_cost=None, min_budget=None, subjects=None):
+        """Вернуть до ``k`` программ, проходной балл которых не выше балла пользователя.
+
+        ``subjects`` — набор сданных предметов: программа подходит, если в
+        каждой её группе есть хотя бы один из них.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"unknown sort key: {sort}")
+        candidates = []
+        for groups, needed, progs in self.buckets:
+            if subjects is not None and not all(subjects.intersection(opts) for opts in groups):
+                continue
+            user_score = calc_program_score(groups, scores)
+            for prog in progs[:bisect_right(needed, user_score)]:
+                row = prog.row
+                if max_cost is not None and row['cost'] > max_cost:
+                    continue
+                if min_budget is not None and (row['budget_total'] or 0) < min_budget:
+                    continue
+                probability, _ = admission_probability(user_score, prog.needed)
+                candidates.append({
+                    'code': row['code'],
+                    'name': row['name'],
+                    'subjects_full': row['subjects_full'],
+                    'score_2024': prog.needed,
+                    'user_score': user_score,
+                    'margin': user_score - prog.needed,
+                    'probability': probability,
+                    'cost': row['cost'],
+                    'cost_display': row['cost_display'],
+                    'budget_total': row['budget_total'],
+                })
+        key, descending = self.SORT_KEYS[sort]
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(k, candidates, key=key)
+
+
+PROGRAM_INDEX = ProgramIndex()
+
+def program_rows(scores):
+    """Строки калькулятора: неизменяемая строка каталога и поля пользователя.
+
+    Ячейки из ``row`` одинаковы для всех и берутся шаблоном из кэша
+    фрагментов, поэтому строка не копируется.
+    """
+    rows = []
+    for prog in PROGRAM_TABLE:
+        user_score = calc_program_score(prog.groups, scores)
+        needed = prog.needed
+        probability, prob_color = admission_probability(user_score, needed)
+        rows.append({
+            'row': prog.row,
+            'eligible': needed is not None and user_score >= needed,
+            'user_score': user_score,
+            'probability': probability,
+            'prob_color': prob_color,
+        })
+    return rows
+
+
 calc_bp = Blueprint('calc', __name__)
 
 @calc_bp.route('/ege_calculator', methods=['GET', 'POST'])
@@ -76,34 +225,9 @@ def ege_calculator():
             except ValueError:
                 scores[key] = 0
 
-    programs = []
-    for p in EGE_PROGRAMS:
-        groups = parse_subjects(p['subjects'])
-        user_score = calc_program_score(groups, scores)
-        needed = p['score_2024']
-        eligible = needed is not None and user_score >= needed
-
-        probability = None
-        prob_color = None
-        if needed is not None:
-            probability = max(0, min(100, round((user_score - needed + 30) / 60 * 100, 1)))
-            if probability >= 60:
-                prob_color = 'bg-success'
-            elif probability >= 30:
-                prob_color = 'bg-warning'
-            else:
-                prob_color = 'bg-danger'
-
-        cost_display = f"{p['cost']:,}".replace(',', ' ') + ' руб/сем'
-
-        programs.append({
-            **p,
-            'eligible': eligible,
-            'user_score': user_score,
-            'probability': probability,
-            'prob_color': prob_color,
-            'cost_display': cost_display,
-            'subjects_full': full_subjects(p['subjects']),
-        })
-
-    return render_template('calculator.html', scores=scores, programs=programs)
+    return render_template(
+        'calculator.html',
+        scores=scores,
+        programs=program_rows(scores),
+        table_version=PROGRAM_TABLE_VERSION,
+    )
@@ -0,0 +1,157 @@
+"""Structured storage of career test results.
+
+Every career ``Result`` keeps the recommended direction in
+``Result.recommended_direction`` and one ``CareerScore`` row per direction,
+so pages read the scores with a single query and analytics can aggregate
+them in SQL. ``result_text`` still receives the JSON document for API
+clients that read it. Saving results also updates the analytics rollups.
+"""
+import json
+
+from app import db
+from app.models import Result, Direction, CareerScore, Test
+from .analytics import record_career_results
+from .database import get_direction_ids
+
+
+def _score_rows(result_id, ordered, direction_ids):
+    return [
+        {
+            "result_id": result_id,
+            "direction_id": direction_ids[direction],
+            "score": score,
+            "position": position,
+        }
+        for position, (direction, score) in enumerate(ordered)
+    ]
+
+
+def save_career_results(entries):
+    """Add career results to the session in bulk (without committing).
+
+    Parameters
+    ----------
+    entries : list
+        Dicts with ``user_id``, ``test_id``, ``recommended``, ``scores``
+        (ordered list of (direction, score) pairs) and optionally ``ege``
+        (the EGE points used for the analytics eligibility rollup).
+
+    Returns
+    -------
+    list
+        The created ``Result`` objects.
+    """
+    direction_ids = get_direction_ids(
+        direction for entry in entries for direction, _ in entry["scores"]
+    )
+    results = [
+        Result(
+            user_id=entry["user_id"],
+            test_id=entry["test_id"],
+            recommended_direction=entry["recommended"],
+            result_text=json.dumps(
+                {"recommended": entry["recommended"], "scores": entry["scores"]},
+                ensure_ascii=False,
+            ),
+        )
+        for entry in entries
+    ]
+    db.session.add_all(results)
+    db.session.flush()
+
+    rows = []
+    for result, entry in zip(results, entries):
+        rows.extend(_score_rows(result.id, entry["scores"], direction_ids))
+    if rows:
+        db.session.execute(db.insert(CareerScore), rows)
+
+    record_career_results([
+        {**entry, "day": result.timestamp.date()}
+        for result, entry in zip(results, entries)
+    ])
+    return results
+
+
+def save_career_result(user_id, test_id, ordered, recommended, ege=None):
+    """Add one career result to the session (without committing)."""
+    entry = {
+        "user_id": user_id,
+        "test_id": test_id,
+        "recommended": recommended,
+        "scores": ordered,
+        "ege": ege,
+    }
+    return save_career_results([entry])[0]
+
+
+def load_career_data(results):
+    """Return ``{result.id: {"recommended": ..., "scores": [...]}}`` for career results.
+
+    Scores of all given results are read with one query. Results that have
+    not been backfilled yet fall back to parsing ``result_text``.
+    """
+    ids = [r.id for r in results]
+    data = {}
+    if ids:
+        rows = db.session.execute(
+            db.select(CareerScore.result_id, Direction.name, CareerScore.score)
+            .join(Direction, CareerScore.direction_id == Direction.id)
+            .where(CareerScore.result_id.in_(ids))
+            .order_by(CareerScore.result_id, CareerScore.position)
+        ).all()
+        for result_id, name, score in rows:
+            data.setdefault(result_id, []).append((name, score))
+
+    parsed = {}
+    for r in results:
+        if r.id in data:
+            parsed[r.id] = {"recommended": r.recommended_direction, "scores": data[r.id]}
+            continue
+        try:
+            parsed[r.id] = json.loads(r.result_text)
+        except (TypeError, ValueError):
+            parsed[r.id] = None
+    return parsed
+
+
+def backfill_career_scores(chunk_size=500):
+    """Convert JSON blobs of old career results into structured rows.
+
+    Results are processed in primary key order, ``chunk_size`` at a time,
+    with one commit per chunk. Rows whose text is not a valid career
+    document are skipped. Returns the number of converted results.
+    """
+    has_scores = db.select(CareerScore.result_id).where(CareerScore.result_id == Result.id).exists()
+    base = (
+        db.select(Result)
+        .join(Test, Result.test_id == Test.id)
+        .where(Test.type == 'career', ~has_scores)
+        .order_by(Result.id)
+        .limit(chunk_size)
+    )
+    converted = 0
+    last_id = 0
+    while True:
+        chunk = db.session.scalars(base.where(Result.id > last_id)).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        parsed = []
+        for result in chunk:
+            try:
+                doc = json.loads(result.result_text)
+                ordered = [(str(name), int(score)) for name, score in doc["scores"]]
+            except (TypeError, ValueError, KeyError):
+                continue
+            parsed.append((result, doc.get("recommended"), ordered))
+
+        direction_ids = get_direction_ids(name for _, _, ordered in parsed for name, _ in ordered)
+        rows = []
+        for result, recommended, ordered in parsed:
+            result.recommended_direction = recommended
+            rows.extend(_score_rows(result.id, ordered, direction_ids))
+        if rows:
+            db.session.execute(db.insert(CareerScore), rows)
+        db.session.commit()
+        converted += len(parsed)
+    return converted
@@ -1,8 +1,13 @@
+import hashlib
 import json
 import re
+import threading
 from pathlib import Path
 
+import numpy as np
+
 from .calc import parse_subjects, calc_program_score
+from .ege_engine import ProgramMatrix, scores_to_matrix
 
 DOC_PATH = Path(__file__).resolve().parents[1] / "docs" / "career_test_structure.md"
 
@@ -31,6 +36,54 @@ def load_structure(path: Path = DOC_PATH):
     return questions, programs
 
 
+# Process-wide cache of parsed documentation: path -> (signature, structure).
+# The signature is the file's (mtime_ns, size), so editing the doc triggers a
+# reload on the next call without restarting the process.
+_structure_cache = {}
+_structure_stats = {"hits": 0, "misses": 0}
+_structure_lock = threading.Lock()
+
+
+def _file_signature(path: Path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_structure(path: Path = DOC_PATH):
+    """Return ``load_structure(path)``, parsing the file only when it changed.
+
+    The returned objects are shared between callers and must not be mutated.
+    """
+    path = Path(path)
+    signature = _file_signature(path)
+    with _structure_lock:
+        cached = _structure_cache.get(path)
+        if cached is not None and cached[0] == signature:
+            _structure_stats["hits"] += 1
+            return cached[1]
+        _structure_stats["misses"] += 1
+
+    structure = load_structure(path)
+    with _structure_lock:
+        _structure_cache[path] = (signature, structure)
+    return structure
+
+
+def structure_cache_info():
+    """Return hit/miss counters and the number of cached documents."""
+    with _structure_lock:
+        return {**_structure_stats, "size": len(_structure_cache)}
+
+
+def clear_structure_cache():
+    """Drop all cached structures and reset the counters."""
+    with _structure_lock:
+        _structure_cache.clear()
+        _compiled_cache.clear()
+        _structure_stats["hits"] = 0
+        _structure_stats["misses"] = 0
+
+
 def calculate_interest_scores(questions, answers):
     """Sum weights for each direction based on user's answers.
 
@@ -60,6 +113,144 @@ def order_scores(scores):
     return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
 
+class CompiledQuestions:
+    """Dense NumPy form of a question set for fast interest scoring.
+
+    Directions are numbered in order of first appearance in the questions.
+    ``weights[q, o, d]`` holds the weight of option ``o`` of question ``q``
+    for direction ``d`` and ``present`` marks which of those weights are
+    defined. Option slot ``missing`` is all zeros and is used for
+    unanswered questions and out-of-range answers, so a whole answer sheet
+    is scored by a single gather followed by a sum over questions.
+
+    ``calculate_interest_scores`` and ``order_scores`` remain the reference
+    implementation. They order tied directions by first appearance among the
+    answered options, so ``first_seen[q, o, d]`` keeps the position of
+    direction ``d`` in that walk (question, then order of the option's
+    weights) and :meth:`order` breaks ties the same way.
+    """
+
+    def __init__(self, questions):
+        directions = []
+        direction_index = {}
+        for q in questions:
+            for option in q["options"]:
+                for direction in option["weights"]:
+                    if direction not in direction_index:
+                        direction_index[direction] = len(directions)
+                        directions.append(direction)
+
+        self.directions = tuple(directions)
+        self.direction_index = direction_index
+        self.question_ids = tuple(q["id"] for q in questions)
+        self.option_counts = np.array([len(q["options"]) for q in questions], dtype=np.intp)
+        self.missing = int(self.option_counts.max()) if len(questions) else 0
+
+        all_ints = all(
+            isinstance(w, int)
+            for q in questions for o in q["options"] for w in o["weights"].values()
+        )
+        shape = (len(questions), self.missing + 1, len(directions))
+        self.weights = np.zeros(shape, dtype=np.int64 if all_ints else np.float64)
+        self.present = np.zeros(shape, dtype=bool)
+        stride = max((len(o["weights"]) for q in questions for o in q["options"]), default=0) or 1
+        self.first_seen = np.full(shape, np.iinfo(np.intp).max, dtype=np.intp)
+        for qi, q in enumerate(questions):
+            for oi, option in enumerate(q["options"]):
+                for position, (direction, weight) in enumerate(option["weights"].items()):
+                    di = direction_index[direction]
+                    self.weights[qi, oi, di] = weight
+                    self.present[qi, oi, di] = True
+                    self.first_seen[qi, oi, di] = qi * stride + position
+        self._rows = np.arange(len(questions))
+
+    def encode(self, answers):
+        """Convert a mapping question id -> option index into an index vector."""
+        idx = np.array([answers.get(qid, -1) for qid in self.question_ids], dtype=np.intp)
+        return self._clip(idx)
+
+    def _clip(self, idx):
+        valid = (idx >= 0) & (idx < self.option_counts)
+        return np.where(valid, idx, self.missing)
+
+    def score_matrix(self, index_matrix):
+        """Score many answer sheets at once.
+
+        Parameters
+        ----------
+        index_matrix : array-like
+            Integer array of shape (submissions, questions) with 0-based option
+            indices; negative or out-of-range values mean "no answer".
+
+        Returns
+        -------
+        tuple
+            ``(totals, present)`` arrays of shape (submissions, directions).
+        """
+        idx = self._clip(np.asarray(index_matrix, dtype=np.intp).reshape(-1, len(self.question_ids)))
+        totals = self.weights[self._rows, idx].sum(axis=1)
+        present = self.present[self._rows, idx].any(axis=1)
+        return totals, present
+
+    def score(self, answers):
+        """Vectorized equivalent of ``calculate_interest_scores``."""
+        idx = self.encode(answers)
+        totals = self.weights[self._rows, idx].sum(axis=0)
+        present = self.present[self._rows, idx].any(axis=0)
+        return {
+            self.directions[d]: totals[d].item() for d in np.flatnonzero(present)
+        }
+
+    def first_seen_matrix(self, index_matrix):
+        """Position of each direction's first appearance for many answer sheets.
+
+        Takes the same input as :meth:`score_matrix` and returns an array of
+        shape (submissions, directions); ties in scores are broken by it.
+        """
+        idx = self._clip(np.asarray(index_matrix, dtype=np.intp).reshape(-1, len(self.question_ids)))
+        return self.first_seen[self._rows, idx].min(axis=1)
+
+    def order(self, totals, present, first_seen=None):
+        """Return (direction, score) tuples sorted descending for one sheet.
+
+        Ties are broken by ``first_seen`` (see :meth:`first_seen_matrix`) as
+        in ``order_scores``, or by direction index if it is not given.
+        """
+        if first_seen is None:
+            ranking = np.argsort(-totals, kind="stable")
+        else:
+            ranking = np.lexsort((first_seen, -totals))
+        return [(self.directions[d], totals[d].item()) for d in ranking if present[d]]
+
+    def ordered_scores(self, answers):
+        """Vectorized equivalent of ``order_scores(calculate_interest_scores(...))``."""
+        idx = self.encode(answers)
+        totals = self.weights[self._rows, idx].sum(axis=0)
+        present = self.present[self._rows, idx].any(axis=0)
+        first_seen = self.first_seen[self._rows, idx].min(axis=0)
+        return self.order(totals, present, first_seen)
+
+
+_compiled_cache = {}
+
+
+def get_compiled_questions(path: Path = DOC_PATH):
+    """Return ``CompiledQuestions`` for the cached structure at ``path``.
+
+    The compiled form is rebuilt whenever :func:`get_structure` reloads the
+    document.
+    """
+    questions, _ = get_structure(path)
+    with _structure_lock:
+        cached = _compiled_cache.get(Path(path))
+        if cached is not None and cached[0] is questions:
+            return cached[1]
+    compiled = CompiledQuestions(questions)
+    with _structure_lock:
+        _compiled_cache[Path(path)] = (questions, compiled)
+    return compiled
+
+
 def recommend_program(scores, ege_scores, programs):
     """Return best matching program considering EGE scores.
 
@@ -95,6 +286,143 @@ def recommend_program(scores, ege_scores, programs):
     return best_direction
 
 
+def _direction_matrix(compiled, programs):
+    """Return a ``ProgramMatrix`` aligned with ``compiled.directions``.
+
+    Directions without a program or without a passing score get no subject
+    groups and a NaN passing score, so they are never eligible.
+    """
+    groups, needed = [], []
+    for direction in compiled.directions:
+        info = programs.get(direction)
+        if info and info.get("score_2024") is not None:
+            groups.append(parse_subjects(info["subjects"]))
+            needed.append(info["score_2024"])
+        else:
+            groups.append([])
+            needed.append(None)
+    return ProgramMatrix(groups, needed)
+
+
+def score_batch(compiled, programs, answer_sheets, ege_scores):
+    """Score many submissions and recommend a program for each of them.
+
+    Vectorized equivalent of running ``calculate_interest_scores``,
+    ``order_scores`` and ``recommend_program`` for every submission.
+
+    Parameters
+    ----------
+    compiled : CompiledQuestions
+        Compiled question set.
+    programs : dict
+        Program table from the structure.
+    answer_sheets : list
+        Either mappings question id -> option index or sequences of option
+        indices in question order (negative values mean "no answer").
+    ege_scores : list
+        Mapping subject -> EGE points for each submission.
+
+    Returns
+    -------
+    list
+        ``{"recommended": ..., "scores": [(direction, score), ...]}`` per
+        submission.
+    """
+    if len(answer_sheets) != len(ege_scores):
+        raise ValueError("answer_sheets and ege_scores must have the same length")
+    if not answer_sheets:
+        return []
+
+    n_questions = len(compiled.question_ids)
+    index_matrix = np.empty((len(answer_sheets), n_questions), dtype=np.intp)
+    for i, sheet in enumerate(answer_sheets):
+        try:
+            if isinstance(sheet, dict):
+                index_matrix[i] = compiled.encode(sheet)
+            else:
+                if len(sheet) != n_questions:
+                    raise ValueError(f"answer vector {i} must contain {n_questions} entries")
+                index_matrix[i] = sheet
+        except OverflowError:
+            raise ValueError(f"answer sheet {i} has an option index out of range") from None
+    totals, present = compiled.score_matrix(index_matrix)
+    first_seen = compiled.first_seen_matrix(index_matrix)
+
+    matrix = _direction_matrix(compiled, programs)
+    eligible = present & matrix.evaluate(scores_to_matrix(ege_scores))["eligible"]
+
+    # Равные баллы упорядочены как в order_scores: по первому появлению направления
+    ranking = np.lexsort((first_seen, -totals), axis=1)
+    ranked_eligible = np.take_along_axis(eligible, ranking, axis=1)
+    first_eligible = ranked_eligible.argmax(axis=1)
+
+    results = []
+    for i in range(len(answer_sheets)):
+        ordered = compiled.order(totals[i], present[i], first_seen[i])
+        if not ordered:
+            recommended = None
+        elif ranked_eligible[i, first_eligible[i]]:
+            recommended = compiled.directions[ranking[i, first_eligible[i]]]
+        else:
+            recommended = ordered[0][0]
+        results.append({"recommended": recommended, "scores": ordered})
+    return results
+
+
+def sync_career_test(path: Path = DOC_PATH):
+    """Load the career questions from the documentation into the database.
+
+    The questions, options and per-direction weights of the career test are
+    replaced only when the SHA-256 of the document differs from the hash
+    stored on the test, so the call is cheap and idempotent on startup.
+    """
+    from app import db
+    from .test_io import import_questions
+
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    test = ensure_career_test()
+    if test.source_hash == digest:
+        return test
+    questions, _ = load_structure(path)
+    import_questions(questions, test=test)
+    test.source_hash = digest
+    db.session.commit()
+    return test
+
+
+_career_questions_cache = {}
+
+
+def get_career_questions(test):
+    """Return ``(questions, CompiledQuestions)`` for a career test stored in the DB.
+
+    Questions use the documentation format. The result is cached per process
+    and rebuilt when the test is re-synced or any test content changes. A
+    test that was never synced and has no questions (e.g. recreated by
+    :func:`ensure_career_test` after the old one was deleted) is filled from
+    the documentation first.
+    """
+    from app import db
+    from app.models import Question
+    from .cache import get_response_cache
+    from .test_io import export_questions
+
+    if test.source_hash is None and db.session.scalar(
+        db.select(Question.id).where(Question.test_id == test.id).limit(1)
+    ) is None:
+        test = sync_career_test()
+    key = (test.id, test.source_hash, get_response_cache().version)
+    with _structure_lock:
+        cached = _career_questions_cache.get(test.id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    questions = export_questions(test.id)
+    entry = (questions, CompiledQuestions(questions))
+    with _structure_lock:
+        _career_questions_cache[test.id] = (key, entry)
+    return entry
+
+
 def ensure_career_test():
     """Make sure a career test record exists in the database."""
     from app.models import Test
@@ -0,0 +1,52 @@
+"""Flask CLI commands (``flask --app run <command>``)."""
+import json
+
+import click
+
+
+def register_commands(app):
+    @app.cli.command('backfill-career-scores')
+    @click.option('--chunk-size', default=500, show_default=True, help='Results per transaction.')
+    def backfill_career_scores_command(chunk_size):
+        """Перенести баллы старых результатов профтеста из JSON в таблицы."""
+        from app.career_store import backfill_career_scores
+
+        converted = backfill_career_scores(chunk_size=chunk_size)
+        click.echo(f'Converted {converted} results.')
+
+    @app.cli.command('rebuild-analytics')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Results read per query.')
+    def rebuild_analytics_command(chunk_size):
+        """Пересчитать агрегаты аналитики по всем результатам."""
+        from app.analytics import rebuild_rollups
+
+        total = rebuild_rollups(chunk_size=chunk_size)
+        click.echo(f'Rebuilt rollups from {total} results.')
+
+    @app.cli.command('import-test')
+    @click.argument('path', type=click.File('r', encoding='utf-8'))
+    @click.option('--title', required=True, help='Test title.')
+    @click.option('--description', default=None, help='Test description.')
+    @click.option('--type', 'test_type', default='career', show_default=True, help='Test type.')
+    def import_test_command(path, title, description, test_type):
+        """Импортировать тест из JSON-файла со списком вопросов."""
+        from app import db
+        from app.test_io import import_questions
+
+        try:
+            test = import_questions(json.load(path), title=title, description=description, test_type=test_type)
+        except ValueError as exc:
+            db.session.rollback()
+            raise click.ClickException(str(exc))
+        db.session.commit()
+        click.echo(f'Imported test {test.id} with {len(test.questions)} questions.')
+
+    @app.cli.command('export-test')
+    @click.argument('test_id', type=int)
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Output file.')
+    def export_test_command(test_id, output):
+        """Выгрузить вопросы теста в JSON."""
+        from app.test_io import export_questions
+
+        json.dump(export_questions(test_id), output, ensure_ascii=False, indent=2)
+        output.write('\n')
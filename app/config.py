@@ -1,5 +1,22 @@
 import os
 
+
+def engine_options(uri):
+    """Параметры пула соединений для серверной СУБД (для SQLite — пусто)."""
+    if uri.startswith('sqlite'):
+        # SQLite настраивается прагмами при подключении (SQLITE_PRAGMAS)
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Пересоздавать соединения раньше, чем их закроет сервер или прокси
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        # Проверять соединение перед выдачей из пула
+        'pool_pre_ping': True,
+    }
+
+
 class Config:
     """Конфигурация приложения."""
     # Секретный ключ для защиты сессий и формы (CSRF)
@@ -7,5 +24,57 @@ class Config:
     # Строка подключения к базе данных (по умолчанию SQLite в текущей директории)
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Размер кэша сериализованных ответов /api/tests (0 — кэш отключен)
+    API_CACHE_SIZE = int(os.environ.get('API_CACHE_SIZE', 256))
+    # Размер страницы результатов в /api/user/<id>/results (по умолчанию и максимум)
+    RESULTS_PAGE_SIZE = 50
+    RESULTS_PAGE_SIZE_MAX = 200
+    # Результатов на странице управления тестом в админ-панели
+    ADMIN_RESULTS_PER_PAGE = 50
+    # Сбор метрик запросов (/admin/metrics) и заголовок Server-Timing
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '') == '1'
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '') == '1'
+    # Кэш фрагментов шаблонов ({% cache %}): 'memory', 'null' (отключен) или
+    # путь к классу 'пакет.модуль:Класс'; размер — число фрагментов
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 4096))
+    # Кэш пользователей для загрузчика Flask-Login: размер и время жизни записи, с
+    # (0 — кэш отключен)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    # Хеширование паролей: метод werkzeug и длина соли. При смене параметров
+    # хеш пароля пересчитывается при следующем входе пользователя
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    # Пул потоков для хеширования: одновременных вычислений, ожидающих в очереди,
+    # и сколько секунд ждать результата (при полной очереди отказ сразу)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = 10
+    # Ограничение неудачных входов (на IP и на логин): запас попыток и пополнение в минуту
+    LOGIN_FAILURE_BURST = 5
+    LOGIN_FAILURES_PER_MINUTE = 5
+    # Прагмы, выполняемые при каждом новом подключении к SQLite
+    SQLITE_PRAGMAS = {}
     # Другие настройки (при необходимости)
     # e.g., DEBUG = True
+
+
+class ProductionConfig(Config):
+    """Профиль для боевого сервера."""
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(Config.SQLALCHEMY_DATABASE_URI)
+    # WAL: читатели не блокируют писателя; synchronous=NORMAL достаточно для WAL.
+    # Писатели ждут друг друга до 15 с (у драйвера по умолчанию 5 с)
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000)),
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+    }
+
+
+# Профили, выбираемые переменной окружения APP_CONFIG
+CONFIGS = {
+    'default': Config,
+    'development': Config,
+    'production': ProductionConfig,
+}
@@ -0,0 +1,74 @@
+"""Database helpers shared by the application modules.
+
+``UPSERT_DIALECTS`` maps dialect names to their ``INSERT`` constructs with
+``ON CONFLICT`` support; :func:`get_direction_ids` resolves direction names
+for the career results, the analytics rollups and the test import.
+
+SQLite keeps settings such as ``busy_timeout`` and ``synchronous`` per
+connection, so they are applied from the engine's ``connect`` event to every
+connection the pool opens. ``SQLITE_PRAGMAS`` maps pragma names to values and
+is applied in order, so ``busy_timeout`` should come before ``journal_mode``
+(switching to WAL needs a brief exclusive lock).
+"""
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Direction
+
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def init_sqlite_pragmas(app):
+    """Apply ``SQLITE_PRAGMAS`` to every new connection of ``app``'s SQLite engines."""
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+    if not pragmas:
+        return
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _pragma_listener(pragmas))
+
+
+def get_direction_ids(names):
+    """Return a mapping name -> ``Direction.id``, creating missing directions."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    ids = dict(db.session.execute(
+        db.select(Direction.name, Direction.id).where(Direction.name.in_(names))
+    ).all())
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+    # Те же направления может одновременно добавлять другой запрос: конфликт
+    # по уникальному имени пропускается, и id перечитываются
+    insert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        db.session.execute(
+            insert(Direction).on_conflict_do_nothing(index_elements=['name']),
+            [{'name': name} for name in missing],
+        )
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.add_all(Direction(name=name) for name in missing)
+        except IntegrityError:
+            pass
+    ids.update(db.session.execute(
+        db.select(Direction.name, Direction.id).where(Direction.name.in_(missing))
+    ).all())
+    return ids
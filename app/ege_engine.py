@@ -0,0 +1,94 @@
+"""Batched EGE scoring over many applicants and programs at once.
+
+Every subject group of every program is a mask over the subjects of
+``SUBJECT_MAP``. The best score of each distinct group is computed once per
+applicant and the per-program totals are then a single matrix product with
+the (groups x programs) incidence matrix.
+"""
+import numpy as np
+
+from .calc import SUBJECT_MAP, PROGRAM_TABLE, PROBABILITY_OFFSET, PROBABILITY_WIDTH
+
+SUBJECTS = tuple(SUBJECT_MAP.values())
+
+
+def scores_to_matrix(score_dicts):
+    """Convert mappings subject -> points into an (applicants x subjects) array."""
+    return np.array(
+        [[scores.get(name) or 0 for name in SUBJECTS] for scores in score_dicts],
+        dtype=np.float64,
+    ).reshape(-1, len(SUBJECTS))
+
+
+class ProgramMatrix:
+    """Subject-group masks and passing scores for a list of programs.
+
+    Parameters
+    ----------
+    groups : list
+        Subject groups of each program as produced by ``parse_subjects``.
+    needed : list
+        Passing score of each program or ``None`` when it is unknown.
+    """
+
+    def __init__(self, groups, needed):
+        distinct = {}
+        for program_groups in groups:
+            for options in program_groups:
+                distinct.setdefault(frozenset(options), len(distinct))
+
+        self.group_masks = np.zeros((len(distinct), len(SUBJECTS)), dtype=bool)
+        for options, g in distinct.items():
+            for name in options:
+                self.group_masks[g, SUBJECTS.index(name)] = True
+
+        # incidence[g, p] counts how many times group g is required by program p
+        self.incidence = np.zeros((len(distinct), len(groups)), dtype=np.float64)
+        for p, program_groups in enumerate(groups):
+            for options in program_groups:
+                self.incidence[distinct[frozenset(options)], p] += 1
+
+        self.needed = np.array(
+            [np.nan if n is None else n for n in needed], dtype=np.float64
+        )
+
+    def group_subjects(self):
+        """Indices into ``SUBJECTS`` of each distinct subject group."""
+        return [np.flatnonzero(mask).tolist() for mask in self.group_masks]
+
+    def program_groups(self):
+        """Distinct group indices required by each program (repeated if needed twice)."""
+        return [
+            [int(g) for g in np.flatnonzero(column) for _ in range(int(column[g]))]
+            for column in self.incidence.T
+        ]
+
+    @classmethod
+    def from_table(cls, table=PROGRAM_TABLE):
+        return cls([prog.groups for prog in table], [prog.needed for prog in table])
+
+    def totals(self, score_matrix):
+        """Return the (applicants x programs) sums of the best group scores."""
+        scores = np.asarray(score_matrix, dtype=np.float64).reshape(-1, len(SUBJECTS))
+        group_best = np.empty((scores.shape[0], len(self.group_masks)), dtype=np.float64)
+        for g, mask in enumerate(self.group_masks):
+            group_best[:, g] = scores[:, mask].max(axis=1)
+        return group_best @ self.incidence
+
+    def evaluate(self, score_matrix):
+        """Totals, eligibility and admission probability for every pair.
+
+        Mirrors ``ege_calculator``: a program is eligible when its passing
+        score is known and reached; the probability is
+        ``clip(round((total - needed + PROBABILITY_OFFSET) / PROBABILITY_WIDTH
+        * 100, 1), 0, 100)`` and NaN for programs without a passing score.
+        """
+        totals = self.totals(score_matrix)
+        diff = totals - self.needed
+        with np.errstate(invalid="ignore"):
+            eligible = diff >= 0
+        probability = np.clip(np.round((diff + PROBABILITY_OFFSET) / PROBABILITY_WIDTH * 100, 1), 0, 100)
+        return {"totals": totals, "eligible": eligible, "probability": probability}
+
+
+PROGRAM_MATRIX = ProgramMatrix.from_table()
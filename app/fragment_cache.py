@@ -0,0 +1,106 @@
+"""Jinja ``{% cache %}`` tag for markup that is the same for every user.
+
+Usage in a template::
+
+    {% cache 'program-cells', table_version, p.code %}
+      <td>{{ p.name }}</td>
+    {% endcache %}
+
+The arguments form the key. Include a data version in it so that edits
+produce new keys; stale fragments are never reused and simply fall out of
+the LRU. The rendered block is stored in the backend chosen by
+``FRAGMENT_CACHE_BACKEND``:
+
+``'memory'``
+    Per-process LRU of ``FRAGMENT_CACHE_SIZE`` fragments (default).
+``'null'``
+    Caching disabled, blocks are rendered every time.
+``'package.module:Class'``
+    Any class accepting ``maxsize`` with ``get(key)``, ``set(key, value)``
+    and ``clear()``; keys are tuples, values are strings.
+"""
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.utils import import_string
+
+
+class MemoryFragmentCache:
+    """Thread-safe LRU of rendered fragments."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.Tuple(key, 'load')]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        backend = self.environment.fragment_cache
+        if backend is None:
+            return caller()
+        value = backend.get(key)
+        if value is None:
+            value = caller()
+            backend.set(key, str(value))
+            return value
+        return Markup(value)
+
+
+def init_fragment_cache(app):
+    """Register the ``{% cache %}`` tag and create the configured backend."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    name = app.config.get('FRAGMENT_CACHE_BACKEND', 'memory')
+    size = app.config.get('FRAGMENT_CACHE_SIZE', 4096)
+    if name == 'null':
+        backend = None
+    elif name == 'memory':
+        backend = MemoryFragmentCache(size)
+    else:
+        backend = import_string(name)(maxsize=size)
+    app.jinja_env.fragment_cache = backend
@@ -0,0 +1,159 @@
+"""Opt-in per-route request instrumentation.
+
+When ``METRICS_ENABLED`` is set, every request records the number of SQL
+statements, the time spent in the database, the template render time and
+the wall time, aggregated per endpoint. The totals are served by
+``/admin/metrics`` in the Prometheus text format and, with
+``METRICS_SERVER_TIMING``, each response carries a ``Server-Timing``
+header.
+"""
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+from app import db
+
+COUNTERS = ('requests', 'db_queries', 'db_seconds', 'template_seconds', 'request_seconds')
+
+
+class MetricsRegistry:
+    """Thread-safe per-endpoint counters."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, **values):
+        with self._lock:
+            route = self._routes.setdefault(endpoint, dict.fromkeys(COUNTERS, 0))
+            route['requests'] += 1
+            for name, value in values.items():
+                route[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(route) for endpoint, route in self._routes.items()}
+
+
+def _timings():
+    if has_app_context():
+        return g.get('_metrics')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['_metrics_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('_metrics_start', None)
+    timings = _timings()
+    if timings is not None and started is not None:
+        timings['db_queries'] += 1
+        timings['db_seconds'] += time.perf_counter() - started
+
+
+def _before_render(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None:
+        timings['_template_start'] = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None and '_template_start' in timings:
+        timings['template_seconds'] += time.perf_counter() - timings.pop('_template_start')
+
+
+def _start_request():
+    g._metrics = {
+        'start': time.perf_counter(),
+        'db_queries': 0,
+        'db_seconds': 0.0,
+        'template_seconds': 0.0,
+    }
+
+
+def _finish_request(response):
+    timings = g.pop('_metrics', None)
+    if timings is None:
+        return response
+    wall = time.perf_counter() - timings['start']
+    current_app.extensions['metrics'].record(
+        request.endpoint or 'unknown',
+        db_queries=timings['db_queries'],
+        db_seconds=timings['db_seconds'],
+        template_seconds=timings['template_seconds'],
+        request_seconds=wall,
+    )
+    if current_app.config.get('METRICS_SERVER_TIMING'):
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={timings["db_seconds"] * 1000:.2f};desc="{timings["db_queries"]} queries"',
+            f'tpl;dur={timings["template_seconds"] * 1000:.2f}',
+            f'total;dur={wall * 1000:.2f}',
+        ])
+    return response
+
+
+def init_metrics(app):
+    """Attach the instrumentation hooks to ``app`` if ``METRICS_ENABLED`` is set."""
+    if not app.config.get('METRICS_ENABLED'):
+        app.extensions['metrics'] = None
+        return
+    app.extensions['metrics'] = MetricsRegistry()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(registry):
+    """Format the registry (and process-wide cache counters) as Prometheus text."""
+    from .career_utils import structure_cache_info
+    from .user_cache import get_user_cache
+
+    descriptions = {
+        'requests': 'Handled requests.',
+        'db_queries': 'SQL statements executed while handling requests.',
+        'db_seconds': 'Time spent executing SQL statements.',
+        'template_seconds': 'Time spent rendering templates.',
+        'request_seconds': 'Wall time spent handling requests.',
+    }
+    snapshot = registry.snapshot()
+    lines = []
+    for name in COUNTERS:
+        metric = f'proftest_{name}_total'
+        lines.append(f'# HELP {metric} {descriptions[name]}')
+        lines.append(f'# TYPE {metric} counter')
+        for endpoint, route in sorted(snapshot.items()):
+            lines.append(f'{metric}{{endpoint="{_escape(endpoint)}"}} {route[name]}')
+
+    cache = structure_cache_info()
+    for name in ('hits', 'misses'):
+        metric = f'proftest_structure_cache_{name}_total'
+        lines.append(f'# HELP {metric} Career structure cache {name}.')
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {cache[name]}')
+
+    users = get_user_cache()
+    if users is not None:
+        stats = users.stats()
+        for name in ('hits', 'misses', 'expired', 'invalidations'):
+            metric = f'proftest_user_cache_{name}_total'
+            lines.append(f'# HELP {metric} User loader cache {name}.')
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {stats[name]}')
+        lines.append('# HELP proftest_user_cache_entries Users currently cached.')
+        lines.append('# TYPE proftest_user_cache_entries gauge')
+        lines.append(f'proftest_user_cache_entries {stats["entries"]}')
+    return '\n'.join(lines) + '\n'
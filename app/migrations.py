@@ -0,0 +1,110 @@
+"""Lightweight schema upgrades for databases created by older versions.
+
+``db.create_all()`` only creates missing tables; columns and indexes added
+to existing tables later would never reach an old database.
+:func:`upgrade_schema` is run from ``create_app`` and adds whatever is
+missing and widens ``String`` columns whose declared length grew (SQLite
+does not enforce ``VARCHAR`` lengths and is left as is). Indexes that became
+unique are rebuilt; if the existing rows violate the new constraint the
+index is left as it is and the duplicates are logged. It is idempotent.
+New columns on existing tables must be nullable.
+"""
+from flask import current_app
+from sqlalchemy import String, func, inspect, select, text
+
+from app import db
+
+
+def upgrade_schema():
+    """Create missing columns and indexes and widen ``String`` columns that grew."""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {col['name']: col for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                _add_column(table, column)
+        if db.engine.dialect.name != 'sqlite':
+            for column in _narrow_columns(table, columns):
+                with db.engine.begin() as conn:
+                    conn.execute(text(_widen_column_ddl(db.engine.dialect, table, column)))
+        existing = _existing_indexes(inspector, table.name)
+        for index in table.indexes:
+            if index.name in existing and (existing[index.name] or not index.unique):
+                continue
+            if index.unique:
+                duplicates = _duplicate_keys(index)
+                if duplicates:
+                    current_app.logger.warning(
+                        'Unique index %s on %s is not created: duplicate values %s. '
+                        'Resolve them and restart the application.',
+                        index.name, table.name, ', '.join(map(repr, duplicates)),
+                    )
+                    continue
+            if index.name in existing:
+                index.drop(db.engine)
+            index.create(db.engine)
+
+
+def _existing_indexes(inspector, table_name):
+    """Map index name -> whether it is unique."""
+    # Рефлексия SQLite пропускает индексы по выражениям (lower(...)), поэтому
+    # они берутся напрямую из PRAGMA
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            rows = conn.execute(text(
+                'PRAGMA index_list({})'.format(db.engine.dialect.identifier_preparer.quote(table_name))
+            )).mappings()
+            return {row['name']: bool(row['unique']) for row in rows}
+    return {ix['name']: bool(ix.get('unique')) for ix in inspector.get_indexes(table_name)}
+
+
+def _duplicate_keys(index, limit=10):
+    """Up to ``limit`` key values that occur more than once for ``index``."""
+    expressions = list(index.expressions)
+    stmt = (
+        select(*expressions)
+        .select_from(index.table)
+        .group_by(*expressions)
+        .having(func.count() > 1)
+        .limit(limit)
+    )
+    with db.engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    return [row[0] if len(row) == 1 else tuple(row) for row in rows]
+
+
+def _add_column(table, column):
+    dialect = db.engine.dialect
+    ddl = 'ALTER TABLE {} ADD COLUMN {} {}'.format(
+        dialect.identifier_preparer.format_table(table),
+        dialect.identifier_preparer.format_column(column),
+        column.type.compile(dialect=dialect),
+    )
+    with db.engine.begin() as conn:
+        conn.execute(text(ddl))
+
+
+def _narrow_columns(table, reflected):
+    """Model ``String`` columns that are longer than in the database."""
+    narrow = []
+    for column in table.columns:
+        info = reflected.get(column.name)
+        if info is None or not isinstance(column.type, String) or column.type.length is None:
+            continue
+        length = getattr(info['type'], 'length', None)
+        if length is not None and length < column.type.length:
+            narrow.append(column)
+    return narrow
+
+
+def _widen_column_ddl(dialect, table, column):
+    preparer = dialect.identifier_preparer
+    table_name = preparer.format_table(table)
+    column_name = preparer.format_column(column)
+    column_type = column.type.compile(dialect=dialect)
+    if dialect.name == 'mysql':
+        null = '' if column.nullable else ' NOT NULL'
+        return f'ALTER TABLE {table_name} MODIFY {column_name} {column_type}{null}'
+    return f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE {column_type}'
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_login import UserMixin
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.security import hash_password, verify_password
 
 # Модель пользователя
 class User(UserMixin, db.Model):
@@ -9,7 +9,13 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    # Вход и проверка уникальности без учета регистра используют lower(...);
+    # уникальность по lower(...) проверяет сама база
+    __table_args__ = (
+        db.Index('ix_users_username_lower', db.func.lower(username), unique=True),
+        db.Index('ix_users_email_lower', db.func.lower(email), unique=True),
+    )
     # Новые поля для хранения полного имени пользователя
     last_name = db.Column(db.String(50))
     first_name = db.Column(db.String(50))
@@ -28,10 +34,10 @@ class User(UserMixin, db.Model):
     results = db.relationship('Result', backref='user', cascade='all, delete-orphan', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     @property
     def full_name(self):
@@ -49,6 +55,8 @@ class Test(db.Model):
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     type = db.Column(db.String(20))  # "career" или "knowledge"
+    # SHA-256 документа, из которого загружены вопросы (для профтеста)
+    source_hash = db.Column(db.String(64))
 
     questions = db.relationship('Question', backref='test', cascade='all, delete-orphan', lazy=True)
     results = db.relationship('Result', backref='test', cascade='all, delete-orphan', lazy=True)
@@ -77,17 +85,104 @@ class Option(db.Model):
     category = db.Column(db.String(50))
     question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
 
+    # Веса по направлениям (для тестов, импортированных в формате профтеста)
+    weights = db.relationship('OptionWeight', backref='option', cascade='all, delete-orphan',
+                              lazy=True, order_by='OptionWeight.position')
+
     def __repr__(self):
         return f'<Option {self.text}>'
 
+# Вес варианта ответа для направления подготовки
+class OptionWeight(db.Model):
+    __tablename__ = 'option_weights'
+    option_id = db.Column(db.Integer, db.ForeignKey('options.id'), primary_key=True)
+    direction_id = db.Column(db.Integer, db.ForeignKey('directions.id'), primary_key=True)
+    weight = db.Column(db.Integer, nullable=False)
+    # Порядок направлений внутри варианта, как в исходном документе
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    direction = db.relationship('Direction')
+
+    def __repr__(self):
+        return f'<OptionWeight option={self.option_id} direction={self.direction_id} weight={self.weight}>'
+
 # Модель результата
 class Result(db.Model):
     __tablename__ = 'results'
+    __table_args__ = (
+        # Последний результат пользователя по тесту (main.result)
+        db.Index('ix_results_user_test_timestamp', 'user_id', 'test_id', 'timestamp'),
+        # Все результаты пользователя по времени (main.profile, API результатов)
+        db.Index('ix_results_user_timestamp', 'user_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
     result_text = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Для профориентационного теста: рекомендованное направление
+    recommended_direction = db.Column(db.String(150))
+
+    career_scores = db.relationship('CareerScore', backref='result', cascade='all, delete-orphan',
+                                    lazy=True, order_by='CareerScore.position')
 
     def __repr__(self):
         return f'<Result user={self.user_id} test={self.test_id}>'
+
+# Модель направления подготовки (для результатов профориентационного теста)
+class Direction(db.Model):
+    __tablename__ = 'directions'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Direction {self.name}>'
+
+# Баллы по направлениям для результата профориентационного теста
+class CareerScore(db.Model):
+    __tablename__ = 'career_scores'
+    __table_args__ = (
+        db.Index('ix_career_scores_direction_score', 'direction_id', 'score'),
+    )
+    result_id = db.Column(db.Integer, db.ForeignKey('results.id'), primary_key=True)
+    direction_id = db.Column(db.Integer, db.ForeignKey('directions.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    # Место направления в отсортированном списке баллов (0 — лучшее)
+    position = db.Column(db.Integer, nullable=False)
+
+    direction = db.relationship('Direction')
+
+    def __repr__(self):
+        return f'<CareerScore result={self.result_id} direction={self.direction_id} score={self.score}>'
+
+# Агрегаты для аналитики админ-панели (обновляются при сохранении результатов)
+class CareerDailyStat(db.Model):
+    __tablename__ = 'stat_career_daily'
+    day = db.Column(db.Date, primary_key=True)
+    results = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DirectionDailyStat(db.Model):
+    __tablename__ = 'stat_direction_daily'
+    day = db.Column(db.Date, primary_key=True)
+    direction_id = db.Column(db.Integer, db.ForeignKey('directions.id'), primary_key=True)
+    results = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    recommended = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DirectionScoreBucket(db.Model):
+    __tablename__ = 'stat_direction_score_buckets'
+    day = db.Column(db.Date, primary_key=True)
+    direction_id = db.Column(db.Integer, db.ForeignKey('directions.id'), primary_key=True)
+    # Нижняя граница интервала баллов (ширина интервала — SCORE_BUCKET_WIDTH)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProgramDailyStat(db.Model):
+    __tablename__ = 'stat_program_daily'
+    day = db.Column(db.Date, primary_key=True)
+    program_code = db.Column(db.String(20), primary_key=True)
+    checked = db.Column(db.Integer, nullable=False, default=0)
+    eligible = db.Column(db.Integer, nullable=False, default=0)
@@ -2,9 +2,11 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app import db
 from app.models import Result, Test, Option
-import json
+from .cache import get_response_cache
+from .career_store import save_career_result, load_career_data
 from .career_utils import (
-    load_structure,
+    get_structure,
+    get_career_questions,
     calculate_interest_scores,
     order_scores,
     recommend_program,
@@ -19,7 +21,20 @@ def index():
     tests = Test.query.filter(Test.type != 'career').all()
     career_test = ensure_career_test()
     career_id = career_test.id if career_test else None
-    return render_template('index.html', tests=tests, career_test_id=career_id)
+    # Пройденные тесты одним запросом вместо загрузки всех результатов пользователя
+    taken = set()
+    if current_user.is_authenticated:
+        taken = set(db.session.scalars(
+            db.select(Result.test_id).where(Result.user_id == current_user.id).distinct()
+        ))
+    return render_template(
+        'index.html',
+        tests=tests,
+        career_test_id=career_id,
+        taken_test_ids=taken,
+        # Карточки тестов кэшируются до изменения тестов (см. app/cache.py)
+        tests_version=get_response_cache().version,
+    )
 
 @main_bp.route('/test/<int:test_id>', methods=['GET', 'POST'])
 @login_required
@@ -45,7 +60,28 @@ def take_test(test_id):
                     score = int(answer_value)
                 except ValueError:
                     flash('Баллы ЕГЭ должны быть числом.', 'danger')
-@@ -98,26 +108,90 @@ def take_test(test_id):
+                    return render_template('test.html', test=test)
+                results_parts.append(f"{question.text}: {score}")
+            result_text = "; ".join(results_parts)
+            db.session.add(Result(user_id=current_user.id, test_id=test.id, result_text=result_text))
+            db.session.commit()
+            return redirect(url_for('main.result', test_id=test.id))
+        else:
+            # Профориентационный тест: суммируем баллы выбранных вариантов по категориям
+            category_scores = {}
+            for question in test.questions:
+                option_id = request.form.get(f"q_{question.id}")
+                if not option_id:
+                    flash('Пожалуйста, ответьте на все вопросы теста.', 'warning')
+                    return render_template('test.html', test=test)
+                option = Option.query.get(int(option_id))
+                if option and option.category:
+                    category_scores[option.category] = category_scores.get(option.category, 0) + (option.score or 0)
+            interest_category = None
+            if category_scores:
+                interest_category = max(category_scores, key=category_scores.get)
+            if interest_category:
+                recommendation = f"Рекомендуем рассмотреть направления подготовки в области «{interest_category}»."
             else:
                 recommendation = "Не удалось определить чёткую область интересов. Попробуйте пройти тест заново или уточнить предпочтения."
             # Финальный текст результата
@@ -73,10 +109,7 @@ def result(test_id):
         return redirect(url_for('main.index'))
     data = None
     if test.type == 'career':
-        try:
-            data = json.loads(result.result_text)
-        except Exception:
-            data = None
+        data = load_career_data([result])[result.id]
     return render_template('result.html', test=test, result=result, data=data)
 
 
@@ -85,15 +118,9 @@ def result(test_id):
 def profile():
     """Личный профиль с результатами всех тестов."""
     user_results = Result.query.filter_by(user_id=current_user.id).order_by(Result.timestamp.desc()).all()
-    results_data = []
-    for r in user_results:
-        parsed = None
-        if r.test.type == 'career':
-            try:
-                parsed = json.loads(r.result_text)
-            except Exception:
-                parsed = None
-        results_data.append({'result': r, 'data': parsed})
+    # Баллы всех профориентационных результатов читаются одним запросом
+    career_data = load_career_data([r for r in user_results if r.test.type == 'career'])
+    results_data = [{'result': r, 'data': career_data.get(r.id)} for r in user_results]
 
     career_test = Test.query.filter_by(type='career').first()
     career_id = career_test.id if career_test else None
@@ -103,9 +130,10 @@ def profile():
 @main_bp.route('/career_test', methods=['GET', 'POST'])
 @login_required
 def career_test():
-    """Standalone career test based on documentation structure."""
-    questions, programs = load_structure()
+    """Standalone career test; questions are synced from the documentation into the DB."""
     career_test = ensure_career_test()
+    questions, _ = get_career_questions(career_test)
+    _, programs = get_structure()
     if request.method == 'POST':
         answers = {}
         for q in questions:
@@ -114,8 +142,9 @@ def career_test():
                 flash('Пожалуйста, ответьте на все вопросы теста.', 'warning')
                 return render_template('career_test.html', questions=questions)
             answers[q['id']] = int(field)
-        scores = calculate_interest_scores(questions, answers)
-        ordered = order_scores(scores)
+        # Одна анкета: обычный подсчет быстрее матричного (он нужен для пакетов)
+        ordered = order_scores(calculate_interest_scores(questions, answers))
+        scores = dict(ordered)
         ege_scores = {
             'math': current_user.ege_math or 0,
             'russian': current_user.ege_russian or 0,
@@ -126,12 +155,7 @@ def career_test():
             'language': 0,
         }
         program = recommend_program(scores, ege_scores, programs)
-        data = {
-            'recommended': program,
-            'scores': ordered,
-        }
-        result_text = json.dumps(data, ensure_ascii=False)
-        db.session.add(Result(user_id=current_user.id, test_id=career_test.id, result_text=result_text))
+        save_career_result(current_user.id, career_test.id, ordered, program, ege_scores)
         db.session.commit()
         return redirect(url_for('main.result', test_id=career_test.id))
 
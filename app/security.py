@@ -0,0 +1,213 @@
+"""Password hashing and login throttling.
+
+Hashing parameters come from ``PASSWORD_HASH_METHOD`` and
+``PASSWORD_SALT_LENGTH``; :func:`needs_rehash` tells whether a stored hash
+was made with other parameters so the login view can upgrade it.
+
+Hashing and verification run in a bounded thread pool
+(``PASSWORD_HASH_WORKERS``). The key derivation functions release the GIL,
+so at most that many CPU-bound hashes run at once and the remaining request
+threads keep serving other routes. At most ``PASSWORD_HASH_QUEUE`` more
+jobs may wait; when the queue is full :class:`HashingBusy` is raised at
+once instead of piling up requests. :func:`submit_hash` and
+:func:`submit_verify` return a ``concurrent.futures.Future`` for callers
+that do not want to block on the result (e.g. to await it with
+``asyncio.wrap_future``); :func:`hash_password` and :func:`verify_password`
+wait for it.
+
+Failed logins are limited by :class:`LoginLimiter`, an in-memory token
+bucket per client IP and per login name. Each process keeps its own
+buckets.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app, has_app_context
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+DEFAULT_SALT_LENGTH = 16
+
+
+class HashingBusy(Exception):
+    """The password hashing pool and its queue are full."""
+
+
+class PasswordHasher:
+    """Bounded pool running password hashing and verification."""
+
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+                 workers=4, queue=32, timeout=10):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def _submit(self, func, *args):
+        # Без ожидания: при заполненной очереди сразу отказываем (503)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy() from None
+
+    def submit_hash(self, password):
+        return self._submit(generate_password_hash, password, self.method, self.salt_length)
+
+    def submit_verify(self, pwhash, password):
+        return self._submit(check_password_hash, pwhash, password)
+
+    def hash(self, password):
+        return self._wait(self.submit_hash(password))
+
+    def verify(self, pwhash, password):
+        return self._wait(self.submit_verify(pwhash, password))
+
+    def needs_rehash(self, pwhash):
+        method, _, rest = pwhash.partition('$')
+        salt = rest.partition('$')[0]
+        return normalize_method(method) != self.method or len(salt) != self.salt_length
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults, e.g. ``'pbkdf2'`` -> ``'pbkdf2:sha256:600000'``."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = (int(a) for a in (args + ['32768', '8', '1'][len(args):]))
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def get_password_hasher():
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
+
+
+def hash_password(password):
+    hasher = get_password_hasher()
+    if hasher is None:
+        return generate_password_hash(password, DEFAULT_METHOD, DEFAULT_SALT_LENGTH)
+    return hasher.hash(password)
+
+
+def verify_password(pwhash, password):
+    hasher = get_password_hasher()
+    if hasher is None:
+        return check_password_hash(pwhash, password)
+    return hasher.verify(pwhash, password)
+
+
+def _completed(func, *args):
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def submit_hash(password):
+    """Start hashing in the pool and return a ``concurrent.futures.Future``."""
+    hasher = get_password_hasher()
+    if hasher is None:
+        return _completed(generate_password_hash, password, DEFAULT_METHOD, DEFAULT_SALT_LENGTH)
+    return hasher.submit_hash(password)
+
+
+def submit_verify(pwhash, password):
+    """Start verification in the pool and return a ``concurrent.futures.Future``."""
+    hasher = get_password_hasher()
+    if hasher is None:
+        return _completed(check_password_hash, pwhash, password)
+    return hasher.submit_verify(pwhash, password)
+
+
+def needs_rehash(pwhash):
+    hasher = get_password_hasher()
+    return hasher is not None and hasher.needs_rehash(pwhash)
+
+
+class LoginLimiter:
+    """Token buckets of failed login attempts keyed by client and login name.
+
+    A bucket holds up to ``burst`` tokens and refills at ``per_minute``
+    tokens per minute; every failure takes one token and an empty bucket
+    blocks further attempts. Full buckets carry no information, so only the
+    ``max_keys`` most recently used ones are kept.
+    """
+
+    def __init__(self, burst=5, per_minute=5, max_keys=10000, clock=time.monotonic):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, keys):
+        """Seconds until every bucket in ``keys`` allows an attempt (0 if allowed now)."""
+        now = self.clock()
+        with self._lock:
+            missing = max((1 - self._tokens(key, now) for key in keys), default=0)
+        if missing <= 0:
+            return 0
+        return missing / self.rate if self.rate else float('inf')
+
+    def fail(self, keys):
+        now = self.clock()
+        with self._lock:
+            for key in keys:
+                self._buckets[key] = (max(0.0, self._tokens(key, now) - 1), now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+
+def login_keys(remote_addr, login):
+    return [('ip', remote_addr or ''), ('login', (login or '').strip().lower())]
+
+
+def get_login_limiter(app=None):
+    app = app or current_app
+    return app.extensions['login_limiter']
+
+
+def init_security(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 4),
+        queue=app.config.get('PASSWORD_HASH_QUEUE', 32),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+    )
+    app.extensions['login_limiter'] = LoginLimiter(
+        burst=app.config.get('LOGIN_FAILURE_BURST', 5),
+        per_minute=app.config.get('LOGIN_FAILURES_PER_MINUTE', 5),
+    )
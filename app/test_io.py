@@ -0,0 +1,130 @@
+"""Bulk import and export of test definitions as JSON.
+
+The document format is the one used by the JSON block of
+``docs/career_test_structure.md``: a list of questions, each with
+``question``, optional ``id`` and ``directions``, and ``options`` made of
+``text`` and per-direction integer ``weights``.
+"""
+from sqlalchemy.orm import selectinload
+
+from app import db
+from app.models import Test, Question, Option, OptionWeight
+from .database import get_direction_ids
+
+QUESTION_TEXT_MAX = Question.__table__.c.text.type.length
+OPTION_TEXT_MAX = Option.__table__.c.text.type.length
+
+
+def _check_text(value, limit, where):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{where}: text must be a non-empty string")
+    if len(value) > limit:
+        raise ValueError(f"{where}: text is longer than {limit} characters")
+
+
+def validate_questions(questions):
+    """Raise ``ValueError`` describing the first problem in a question list."""
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("document must be a non-empty list of questions")
+    seen_ids = set()
+    for qi, q in enumerate(questions, 1):
+        where = f"question {qi}"
+        if not isinstance(q, dict):
+            raise ValueError(f"{where}: must be an object")
+        _check_text(q.get("question"), QUESTION_TEXT_MAX, where)
+        if "id" in q:
+            if not isinstance(q["id"], int) or q["id"] in seen_ids:
+                raise ValueError(f"{where}: id must be a unique integer")
+            seen_ids.add(q["id"])
+        directions = q.get("directions", [])
+        if not isinstance(directions, list) or not all(isinstance(d, str) for d in directions):
+            raise ValueError(f"{where}: directions must be a list of strings")
+        options = q.get("options")
+        if not isinstance(options, list) or not options:
+            raise ValueError(f"{where}: options must be a non-empty list")
+        for oi, option in enumerate(options, 1):
+            owhere = f"{where}, option {oi}"
+            if not isinstance(option, dict):
+                raise ValueError(f"{owhere}: must be an object")
+            _check_text(option.get("text"), OPTION_TEXT_MAX, owhere)
+            weights = option.get("weights", {})
+            if not isinstance(weights, dict) or not all(
+                isinstance(name, str) and name and isinstance(w, int) and not isinstance(w, bool)
+                for name, w in weights.items()
+            ):
+                raise ValueError(f"{owhere}: weights must map direction names to integers")
+
+
+def import_questions(questions, title=None, description=None, test_type='career', test=None):
+    """Create a test (or replace the questions of ``test``) from a document.
+
+    The whole tree is added in one flush, which SQLAlchemy sends as one
+    batched INSERT per table. Each option's ``category``/``score`` are set
+    to its highest-weighted direction so the generic test page can use it.
+    The caller commits.
+    """
+    validate_questions(questions)
+    direction_ids = get_direction_ids(
+        name for q in questions for option in q["options"] for name in option.get("weights", {})
+    )
+    if test is None:
+        test = Test(title=title, description=description, type=test_type)
+        db.session.add(test)
+    else:
+        test.questions = []
+        db.session.flush()
+
+    for q in questions:
+        question = Question(text=q["question"])
+        # Order weights by the "directions" list: JSON object key order is not guaranteed
+        order = {name: i for i, name in enumerate(q.get("directions", []))}
+        for option in q["options"]:
+            weights = dict(sorted(
+                option.get("weights", {}).items(),
+                key=lambda item: order.get(item[0], len(order)),
+            ))
+            top = max(weights, key=weights.get) if weights else None
+            question.options.append(Option(
+                text=option["text"],
+                category=top,
+                score=weights[top] if top else 0,
+                weights=[
+                    OptionWeight(direction_id=direction_ids[name], weight=weight, position=pos)
+                    for pos, (name, weight) in enumerate(weights.items())
+                ],
+            ))
+        test.questions.append(question)
+    db.session.flush()
+    return test
+
+
+def export_questions(test_id):
+    """Return the questions of a test in the import document format."""
+    questions = (
+        Question.query
+        .filter_by(test_id=test_id)
+        .options(
+            selectinload(Question.options)
+            .selectinload(Option.weights)
+            .selectinload(OptionWeight.direction)
+        )
+        .order_by(Question.id)
+        .all()
+    )
+    document = []
+    for position, question in enumerate(questions, 1):
+        options = []
+        directions = []
+        for option in sorted(question.options, key=lambda o: o.id):
+            weights = {w.direction.name: w.weight for w in option.weights}
+            for name in weights:
+                if name not in directions:
+                    directions.append(name)
+            options.append({"text": option.text, "weights": weights})
+        document.append({
+            "id": position,
+            "question": question.text,
+            "directions": directions,
+            "options": options,
+        })
+    return document
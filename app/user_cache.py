@@ -0,0 +1,145 @@
+"""Short-lived cache of logged-in users for the Flask-Login user loader.
+
+The loader runs on every authenticated request. The cache keeps a snapshot
+of the ``User`` column values for ``USER_CACHE_TTL`` seconds and rebuilds
+the object without a query: the snapshot is turned into a detached instance
+and merged into the request session with ``load=False``, so the object
+behaves like a loaded one (relationships such as ``results`` still load
+lazily).
+
+Committed ORM changes to a ``User`` drop its entry in this process. Bulk
+Core statements and other processes are not seen; those must call
+:func:`invalidate_user` or rely on the TTL, which bounds how long a stale
+profile can be served.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+class UserCache:
+    """Bounded LRU mapping user id -> column snapshot with a TTL."""
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[user_id]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, snapshot):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (self.clock() + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Drop one user's entry, or every entry if ``user_id`` is None."""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_user_cache(app=None):
+    app = app or current_app
+    return app.extensions.get('user_cache')
+
+
+def invalidate_user(user_id=None):
+    """Forget a cached user (all users if ``user_id`` is None) in the current app."""
+    if has_app_context():
+        cache = get_user_cache()
+        if cache is not None:
+            cache.invalidate(user_id)
+
+
+def _snapshot(user):
+    return {attr.key: getattr(user, attr.key) for attr in inspect(type(user)).column_attrs}
+
+
+def load_cached_user(session, model, user_id):
+    """Return ``model`` with primary key ``user_id``, from the cache when possible."""
+    cache = get_user_cache()
+    if cache is None:
+        return session.get(model, user_id)
+    snapshot = cache.get(user_id)
+    if snapshot is not None:
+        user = model(**snapshot)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+    user = session.get(model, user_id)
+    if user is not None:
+        cache.set(user_id, _snapshot(user))
+    return user
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    from app.models import User
+
+    changed = {
+        obj.id for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if changed:
+        session.info.setdefault('users_changed', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('users_changed', ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('users_changed', None)
+
+
+def init_user_cache(app):
+    size = app.config.get('USER_CACHE_SIZE', 1024)
+    ttl = app.config.get('USER_CACHE_TTL', 60)
+    app.extensions['user_cache'] = UserCache(size, ttl) if size > 0 and ttl > 0 else None
@@ -0,0 +1,103 @@
+"""Synthetic data generators for the benchmarks."""
+import random
+
+from app.calc import SUBJECT_MAP
+
+SUBJECT_LETTERS = list(SUBJECT_MAP)
+SUBJECTS = list(SUBJECT_MAP.values())
+
+
+def direction_names(n):
+    return [f"Направление {i}" for i in range(n)]
+
+
+def make_questions(n_questions, n_directions, n_options=5, per_question=2, seed=0):
+    """Questions in the docs/career_test_structure.md format."""
+    rng = random.Random(seed)
+    names = direction_names(n_directions)
+    questions = []
+    for qid in range(1, n_questions + 1):
+        directions = rng.sample(names, min(per_question, n_directions))
+        questions.append({
+            "id": qid,
+            "question": f"Вопрос {qid}",
+            "directions": directions,
+            "options": [
+                {"text": f"Вариант {o}", "weights": {d: o + 1 for d in directions}}
+                for o in range(n_options)
+            ],
+        })
+    return questions
+
+
+def make_answers(questions, seed=0):
+    rng = random.Random(seed)
+    return {q["id"]: rng.randrange(len(q["options"])) for q in questions}
+
+
+def make_subjects(rng):
+    third = "/".join(rng.sample(["И", "Ф", "Х", "О", "А"], rng.randint(1, 3)))
+    return f"Р + М + {third}"
+
+
+def make_direction_programs(n_directions, seed=0):
+    """Program table keyed by direction name, as returned by ``load_structure``."""
+    rng = random.Random(seed)
+    return {
+        name: {"subjects": make_subjects(rng), "score_2024": rng.choice([None, *range(150, 280)])}
+        for name in direction_names(n_directions)
+    }
+
+
+def make_ege_programs(n_programs, seed=0):
+    """Entries in the ``EGE_PROGRAMS`` format."""
+    rng = random.Random(seed)
+    programs = []
+    for i in range(n_programs):
+        programs.append({
+            "code": f"{i // 100:02d}.03.{i % 100:02d}",
+            "name": f"Программа {i}",
+            "subjects": make_subjects(rng),
+            "score_2024": rng.choice([None, *range(150, 280)]),
+            "score_2023": None,
+            "score_2022": None,
+            "score_2021": None,
+            "cost": rng.randrange(100_000, 400_000, 100),
+            "budget_total": rng.choice([None, *range(5, 150)]),
+            "paid_ru": rng.randrange(0, 50),
+            "paid_int": rng.randrange(0, 20),
+        })
+    return programs
+
+
+def make_ege_scores(seed=0):
+    rng = random.Random(seed)
+    return {name: rng.randrange(40, 101) for name in SUBJECTS}
+
+
+def make_structure_doc(n_questions, n_directions, seed=0):
+    """Markdown document in the ``docs/career_test_structure.md`` layout."""
+    import json
+
+    questions = make_questions(n_questions, n_directions, seed=seed)
+    programs = make_direction_programs(n_directions, seed=seed)
+    rows = [
+        f"| {name} | {info['subjects']} | {info['score_2024'] if info['score_2024'] is not None else '—'} |"
+        for name, info in programs.items()
+    ]
+    return "\n".join([
+        "# Профориентационный тест",
+        "",
+        "## Вопросы и веса",
+        "",
+        "```json",
+        json.dumps(questions, ensure_ascii=False, indent=2),
+        "```",
+        "",
+        "## Профильные предметы и проходные баллы",
+        "",
+        "| Направление | Предметы | Балл 2024 |",
+        "|---|---|---|",
+        *rows,
+        "",
+    ])
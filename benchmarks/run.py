@@ -0,0 +1,367 @@
+"""Benchmarks for the scoring, calculator and API hot paths.
+
+Each benchmark is a setup function that builds its synthetic data and
+returns a zero-argument callable; only the callable is timed. Usage::
+
+    python -m benchmarks.run                      # run everything
+    python -m benchmarks.run -k api --quick       # filter by name, fewer rounds
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+
+With ``--compare`` the exit status is 1 if any benchmark's median got
+slower than the baseline by more than ``threshold`` (a fraction).
+"""
+import argparse
+import contextlib
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from . import generators as gen
+
+BENCHMARKS = []
+# Teardown callbacks registered by the current benchmark's setup.
+CLEANUP = []
+
+
+def benchmark(name, params):
+    """Register ``setup(**params)`` for every parameter dict in ``params``."""
+    def decorator(setup):
+        for values in params:
+            label = ",".join(f"{key}={value}" for key, value in values.items())
+            BENCHMARKS.append((f"{name}[{label}]", setup, values))
+        return setup
+    return decorator
+
+
+@contextlib.contextmanager
+def patched(obj, name, value):
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, old)
+
+
+# --- pure functions -------------------------------------------------------
+
+SCORING_SIZES = [
+    {"questions": 30, "directions": 21},
+    {"questions": 200, "directions": 50},
+    {"questions": 1000, "directions": 200},
+]
+
+
+@benchmark("calculate_interest_scores", SCORING_SIZES)
+def bench_calculate_interest_scores(questions, directions):
+    from app.career_utils import calculate_interest_scores
+
+    qs = gen.make_questions(questions, directions)
+    answers = gen.make_answers(qs)
+    return lambda: calculate_interest_scores(qs, answers)
+
+
+@benchmark("compiled_scores", SCORING_SIZES)
+def bench_compiled_scores(questions, directions):
+    from app.career_utils import CompiledQuestions
+
+    qs = gen.make_questions(questions, directions)
+    compiled = CompiledQuestions(qs)
+    answers = gen.make_answers(qs)
+    return lambda: compiled.ordered_scores(answers)
+
+
+@benchmark("recommend_program", [{"directions": n} for n in (21, 100, 500)])
+def bench_recommend_program(directions):
+    from app.career_utils import recommend_program
+
+    programs = gen.make_direction_programs(directions)
+    scores = {name: i % 37 for i, name in enumerate(programs)}
+    ege = gen.make_ege_scores()
+    return lambda: recommend_program(scores, ege, programs)
+
+
+@benchmark("load_structure", [
+    {"questions": 30, "directions": 21},
+    {"questions": 300, "directions": 100},
+])
+def bench_load_structure(questions, directions):
+    from app.career_utils import load_structure
+
+    tmp = tempfile.NamedTemporaryFile("w", suffix=".md", encoding="utf-8", delete=False)
+    with tmp:
+        tmp.write(gen.make_structure_doc(questions, directions))
+    path = Path(tmp.name)
+    CLEANUP.append(path.unlink)
+    return lambda: load_structure(path)
+
+
+# --- endpoints through the test client ------------------------------------
+
+def make_app(**settings):
+    from app import create_app
+    from app.config import Config
+
+    config = type("BenchConfig", (Config,), {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "WTF_CSRF_ENABLED": False,
+        **settings,
+    })
+    app = create_app(config)
+    ctx = app.app_context()
+    ctx.push()
+    CLEANUP.append(ctx.pop)
+    return app
+
+
+def logged_in_client(app, **fields):
+    from app import db
+    from app.models import User
+
+    user = User(username="bench", email="bench@example.com", password_hash="-", **fields)
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client, user
+
+
+def get_ok(client, url):
+    def call():
+        resp = client.get(url)
+        if resp.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {resp.status_code}")
+        return resp
+    return call
+
+
+@benchmark("calc.ege_calculator", [{"programs": n} for n in (68, 500, 2000)])
+def bench_ege_calculator(programs):
+    from app import calc
+
+    app = make_app()
+    client, _ = logged_in_client(app, ege_math=80, ege_russian=75, ege_physics=70)
+    stack = contextlib.ExitStack()
+    stack.enter_context(patched(calc, "PROGRAM_TABLE", calc.compile_programs(gen.make_ege_programs(programs))))
+    CLEANUP.append(stack.close)
+    return get_ok(client, "/calc/ege_calculator")
+
+
+@benchmark("api.test_detail", [
+    {"questions": q, "directions": d, "cached": cached}
+    for q, d in ((30, 21), (300, 100))
+    for cached in (False, True)
+])
+def bench_api_test_detail(questions, directions, cached):
+    from app import db
+    from app.test_io import import_questions
+
+    app = make_app(API_CACHE_SIZE=256 if cached else 0)
+    client = app.test_client()
+    test = import_questions(gen.make_questions(questions, directions), title="Бенчмарк")
+    db.session.commit()
+    return get_ok(client, f"/api/tests/{test.id}")
+
+
+@benchmark("profile", [{"results": n} for n in (10, 100, 1000)])
+def bench_profile(results):
+    from app import db
+    from app.career_store import save_career_results
+    from app.career_utils import ensure_career_test
+
+    app = make_app()
+    client, user = logged_in_client(app)
+    test = ensure_career_test()
+    directions = gen.direction_names(21)
+    save_career_results([
+        {
+            "user_id": user.id,
+            "test_id": test.id,
+            "recommended": directions[i % 21],
+            "scores": [(name, (i * 7 + j) % 50) for j, name in enumerate(directions)],
+        }
+        for i in range(results)
+    ])
+    db.session.commit()
+    db.session.expire_all()
+    return get_ok(client, "/profile")
+
+
+# --- template rendering with and without the fragment cache -----------------
+
+def render_context(app, user):
+    from flask_login import login_user
+
+    ctx = app.test_request_context()
+    ctx.push()
+    CLEANUP.append(ctx.pop)
+    login_user(user)
+
+
+@benchmark("render.calculator", [
+    {"programs": n, "fragment_cache": backend}
+    for n in (68, 500, 2000)
+    for backend in ("null", "memory")
+])
+def bench_render_calculator(programs, fragment_cache):
+    from flask import render_template
+    from app import calc
+
+    app = make_app(FRAGMENT_CACHE_BACKEND=fragment_cache)
+    _, user = logged_in_client(app, ege_math=80, ege_russian=75, ege_physics=70)
+    stack = contextlib.ExitStack()
+    stack.enter_context(patched(calc, "PROGRAM_TABLE", calc.compile_programs(gen.make_ege_programs(programs))))
+    CLEANUP.append(stack.close)
+    render_context(app, user)
+    scores = dict.fromkeys(calc.SUBJECT_NAMES, 0) | gen.make_ege_scores()
+    rows = calc.program_rows(scores)
+    return lambda: render_template("calculator.html", scores=scores, programs=rows,
+                                   table_version=calc.PROGRAM_TABLE_VERSION)
+
+
+@benchmark("render.index", [
+    {"tests": n, "fragment_cache": backend}
+    for n in (10, 200)
+    for backend in ("null", "memory")
+])
+def bench_render_index(tests, fragment_cache):
+    from flask import render_template
+    from app import db
+    from app.models import Test
+
+    app = make_app(FRAGMENT_CACHE_BACKEND=fragment_cache)
+    _, user = logged_in_client(app)
+    db.session.add_all(
+        Test(title=f"Тест {i}", description=f"Описание теста номер {i}", type="knowledge")
+        for i in range(tests)
+    )
+    db.session.commit()
+    items = Test.query.all()
+    taken = {t.id for t in items[::3]}
+    render_context(app, user)
+    return lambda: render_template("index.html", tests=items, career_test_id=None,
+                                   taken_test_ids=taken, tests_version=0)
+
+
+# --- runner -----------------------------------------------------------------
+
+def measure(func, rounds=7, min_time=0.05):
+    """Time ``func`` and return per-call statistics in seconds.
+
+    The number of calls per round is chosen so that a round takes at least
+    ``min_time`` seconds; the median over ``rounds`` rounds is the figure
+    used for comparisons.
+    """
+    func()  # прогрев: ленивые импорты, кэши шаблонов
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 >= min_time else 10
+    timings = [elapsed / number]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "mean": statistics.fmean(timings),
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def run(selected, rounds, min_time):
+    results = {}
+    for name, setup, params in selected:
+        try:
+            func = setup(**params)
+            results[name] = measure(func, rounds=rounds, min_time=min_time)
+        finally:
+            while CLEANUP:
+                CLEANUP.pop()()
+        print(f"{name:<60} {format_time(results[name]['median']):>10}  (x{results[name]['number']})")
+    return results
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(results, baseline, threshold):
+    """Print the ratio to the baseline and return the names that regressed."""
+    regressions = []
+    print()
+    print(f"{'benchmark':<60} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<60} {'—':>10} {format_time(current['median']):>10}")
+            continue
+        ratio = current["median"] / before["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<60} {format_time(before['median']):>10} "
+              f"{format_time(current['median']):>10} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="filter", help="run only benchmarks whose name contains this substring")
+    parser.add_argument("--quick", action="store_true", help="fewer and shorter rounds")
+    parser.add_argument("--save", type=Path, help="write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown of the median before failing (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    selected = [b for b in BENCHMARKS if not args.filter or args.filter in b[0]]
+    if not selected:
+        parser.error(f"no benchmarks match {args.filter!r}")
+    rounds, min_time = (3, 0.02) if args.quick else (7, 0.05)
+    results = run(selected, rounds, min_time)
+
+    if args.save:
+        document = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "benchmarks": results,
+        }
+        args.save.write_text(json.dumps(document, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"\nsaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))["benchmarks"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
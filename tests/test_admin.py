@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import Config
+from app.models import User, Test, Question, Option, Result
+from app.career_utils import load_structure
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username="admin", email="admin@example.com", password="password123", **extra):
+    data = {
+        "username": username,
+        "email": email,
+        "password": password,
+        "confirm": password,
+        "birth_date": "2000-01-01",
+        "is_student": "0",
+    }
+    data.update(extra)
+    return client.post("/register", data=data, follow_redirects=True)
+
+
+def take_career_test(client, option):
+    questions, _ = load_structure()
+    return client.post("/career_test", data={f"q_{q['id']}": option for q in questions})
+
+
+def test_analytics_rollups_follow_new_results(client, app):
+    register(client, is_student="1", ege_math="95", ege_russian="95", ege_physics="95")
+    take_career_test(client, 4)
+    take_career_test(client, 0)
+
+    data = client.get("/admin/analytics/data").get_json()
+    assert data["total_results"] == 2
+    assert data["daily"][0]["results"] == 2
+    assert sum(d["recommended"] for d in data["directions"]) == 2
+    engineering = next(p for p in data["programs"] if p["code"] == "15.03.01")
+    assert engineering == {**engineering, "checked": 2, "eligible": 2}
+    assert client.get("/admin/analytics").status_code == 200
+
+
+def test_rebuild_rollups_matches_incremental(client, app):
+    from app.analytics import rebuild_rollups
+
+    register(client, is_student="1", ege_math="70", ege_russian="70", ege_physics="70")
+    for option in (1, 3, 4):
+        take_career_test(client, option)
+    incremental = client.get("/admin/analytics/data").get_json()
+
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(db.session, "after_commit", listener)
+    try:
+        assert rebuild_rollups(chunk_size=2) == 3
+    finally:
+        event.remove(db.session, "after_commit", listener)
+    # Один коммит на всю пересборку: дашборд не видит частичных сумм
+    assert len(commits) == 1
+    assert client.get("/admin/analytics/data").get_json() == incremental
+
+
+def test_analytics_requires_admin(client):
+    register(client)
+    client.get("/logout")
+    register(client, username="student", email="student@example.com")
+    assert client.get("/admin/analytics/data").status_code == 403
+
+
+def test_export_streams_csv_and_ndjson(client, app):
+    register(client)
+    take_career_test(client, 2)
+    take_career_test(client, 3)
+    test_id = Test.query.filter_by(type="career").first().id
+
+    resp = client.get(f"/admin/test/{test_id}/export?format=csv")
+    assert resp.is_streamed
+    rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+    assert rows[0][:3] == ["result_id", "user_id", "username"]
+    assert len(rows) == 3
+    assert rows[1][2] == "admin"
+
+    resp = client.get(f"/admin/test/{test_id}/export?format=ndjson")
+    records = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r["username"] for r in records] == ["admin", "admin"]
+    assert records[0]["recommended_direction"]
+
+    assert client.get(f"/admin/test/{test_id}/export?from=2000-01-01&to=2000-01-02").get_data(as_text=True).count("\n") == 1
+    assert client.get(f"/admin/test/{test_id}/export?format=xml").status_code == 400
+
+
+def test_admin_test_detail_is_paginated_with_constant_queries(client, app):
+    register(client)
+    app.config["ADMIN_RESULTS_PER_PAGE"] = 5
+
+    def populate(n_questions, n_users):
+        test = Test(title=f"T{n_questions}", type="knowledge")
+        for qi in range(n_questions):
+            question = Question(text=f"Q{qi}")
+            question.options = [Option(text=f"O{oi}") for oi in range(3)]
+            test.questions.append(question)
+        db.session.add(test)
+        for ui in range(n_users):
+            user = User(username=f"u{n_questions}_{ui}", email=f"u{n_questions}_{ui}@example.com")
+            user.set_password("x")
+            db.session.add(user)
+            db.session.add(Result(user=user, test=test, result_text=f"res{ui}"))
+        db.session.commit()
+        return test.id
+
+    small = populate(1, 1)
+    large = populate(10, 12)
+
+    counts = []
+    for test_id in (small, large):
+        db.session.expire_all()
+        listener = lambda *args: counts.append(test_id)
+        event.listen(db.engine, "before_cursor_execute", listener)
+        resp = client.get(f"/admin/test/{test_id}")
+        event.remove(db.engine, "before_cursor_execute", listener)
+        assert resp.status_code == 200
+    assert counts.count(small) == counts.count(large)
+
+    html = client.get(f"/admin/test/{large}?page=3").get_data(as_text=True)
+    assert "результатов: 12" in html
+    assert html.count("<td>res") == 2
+
+
+def test_import_export_round_trips_career_structure(client, app):
+    register(client)
+    questions, _ = load_structure()
+    resp = client.post("/admin/test/import", json={"title": "Импорт", "questions": questions})
+    assert resp.status_code == 201
+    test_id = resp.get_json()["id"]
+    assert Question.query.filter_by(test_id=test_id).count() == len(questions)
+
+    exported = client.get(f"/admin/test/{test_id}/definition").get_json()
+    assert exported == questions
+    first_option = Question.query.filter_by(test_id=test_id).order_by(Question.id).first().options[0]
+    assert first_option.category == "Прикладная математика"
+
+
+def test_import_rejects_invalid_document_atomically(client, app):
+    register(client)
+    questions, _ = load_structure()
+    broken = questions[:2] + [{"question": "Без вариантов", "options": []}]
+    before = Test.query.count()
+    resp = client.post("/admin/test/import", json={"title": "Broken", "questions": broken})
+    assert resp.status_code == 400
+    assert "question 3" in resp.get_json()["error"]
+    assert Test.query.count() == before
+
+
+def test_import_export_cli(app, tmp_path):
+    questions, _ = load_structure()
+    source = tmp_path / "questions.json"
+    source.write_text(json.dumps(questions[:3], ensure_ascii=False), encoding="utf-8")
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["import-test", str(source), "--title", "CLI"])
+    assert result.exit_code == 0, result.output
+    test_id = Test.query.filter_by(title="CLI").one().id
+
+    target = tmp_path / "out.json"
+    result = runner.invoke(args=["export-test", str(test_id), "--output", str(target)])
+    assert result.exit_code == 0, result.output
+    assert json.loads(target.read_text(encoding="utf-8")) == questions[:3]
+
+
+class MetricsConfig(TestConfig):
+    METRICS_ENABLED = True
+    METRICS_SERVER_TIMING = True
+
+
+def test_metrics_endpoint_and_server_timing():
+    app = create_app(MetricsConfig)
+    with app.app_context():
+        client = app.test_client()
+        register(client)
+        resp = client.get("/api/tests")
+        assert resp.headers["Server-Timing"].startswith("db;dur=")
+
+        text = client.get("/admin/metrics").get_data(as_text=True)
+        assert 'proftest_requests_total{endpoint="api.api_get_tests"} 1' in text
+        assert 'proftest_db_queries_total{endpoint="auth.register"}' in text
+        assert "# TYPE proftest_template_seconds_total counter" in text
+        assert "proftest_structure_cache_hits_total" in text
+        assert "proftest_user_cache_hits_total" in text
+        db.session.remove()
+        db.drop_all()
+
+
+def test_metrics_disabled_by_default(client):
+    register(client)
+    assert client.get("/admin/metrics").status_code == 404
+    assert "Server-Timing" not in client.get("/api/tests").headers
@@ -0,0 +1,202 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import Config
+from app.models import User, Test, Question, Option, Result
+from app.career_utils import load_structure
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username="admin", email="admin@example.com", password="password123"):
+    return client.post(
+        "/register",
+        data={
+            "username": username,
+            "email": email,
+            "password": password,
+            "confirm": password,
+            "birth_date": "2000-01-01",
+            "is_student": "0",
+        },
+        follow_redirects=True,
+    )
+
+
+def test_score_batch_scores_and_saves(client, app):
+    register(client)
+    questions, _ = load_structure()
+    user_id = User.query.filter_by(username="admin").first().id
+    payload = {
+        "save": True,
+        "submissions": [
+            {"answers": [4] * len(questions), "ege": {"math": 90, "russian": 90, "informatics": 90}, "user_id": user_id},
+            {"answers": {str(questions[0]["id"]): 0}, "ege": {}},
+        ],
+    }
+    resp = client.post("/api/career/score_batch", json=payload)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["saved"] == 1
+    assert len(data["results"]) == 2
+    assert data["results"][0]["recommended"]
+    assert Result.query.filter_by(user_id=user_id).count() == 1
+
+
+def test_score_batch_rejects_bad_payload(client):
+    register(client)
+    assert client.post("/api/career/score_batch", json={"submissions": [{"answers": "x"}]}).status_code == 400
+    assert client.post("/api/career/score_batch", json={"submissions": [{"answers": [1]}]}).status_code == 400
+    assert client.post("/api/career/score_batch", json=[1, 2]).status_code == 400
+    for ege in ([1, 2], "x"):
+        resp = client.post("/api/career/score_batch", json={"submissions": [{"answers": {}, "ege": ege}]})
+        assert resp.status_code == 400
+    questions, _ = load_structure()
+    for answers in ([10**30] * len(questions), {str(questions[0]["id"]): 10**30}):
+        resp = client.post("/api/career/score_batch", json={"submissions": [{"answers": answers}]})
+        assert resp.status_code == 400
+    for user_id in ([1], {"id": 1}, "1", True, 1.5):
+        resp = client.post("/api/career/score_batch", json={
+            "submissions": [{"answers": {}, "user_id": user_id}], "save": True,
+        })
+        assert resp.status_code == 400
+        assert "user_id" in resp.get_json()["error"]
+
+
+def test_score_batch_requires_admin(client):
+    register(client)
+    client.get("/logout")
+    register(client, username="student", email="student@example.com")
+    assert client.post("/api/career/score_batch", json={"submissions": []}).status_code == 403
+
+
+class QueryCounter:
+    """Count SQL statements sent to the engine inside a ``with`` block."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _callback(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._callback)
+
+
+def make_test(n_questions, n_options):
+    test = Test(title=f"Test {n_questions}", type="knowledge")
+    for qi in range(n_questions):
+        question = Question(text=f"Q{qi}")
+        question.options = [Option(text=f"O{qi}.{oi}", score=oi) for oi in range(n_options)]
+        test.questions.append(question)
+    db.session.add(test)
+    db.session.commit()
+    return test.id
+
+
+def test_test_detail_uses_constant_number_of_queries(client, app):
+    small_id = make_test(2, 2)
+    large_id = make_test(30, 5)
+    db.session.remove()
+
+    with QueryCounter(db.engine) as small:
+        resp = client.get(f"/api/tests/{small_id}")
+    assert resp.status_code == 200
+
+    with QueryCounter(db.engine) as large:
+        resp = client.get(f"/api/tests/{large_id}")
+    data = resp.get_json()
+    assert len(data["questions"]) == 30
+    assert sum(len(q["options"]) for q in data["questions"]) == 150
+    assert large.count == small.count <= 3
+
+
+def test_test_detail_not_found(client):
+    assert client.get("/api/tests/999").status_code == 404
+
+
+def test_test_detail_cached_with_etag(client, app):
+    test_id = make_test(3, 2)
+    first = client.get(f"/api/tests/{test_id}")
+    etag = first.headers["ETag"]
+
+    with QueryCounter(db.engine) as counter:
+        again = client.get(f"/api/tests/{test_id}")
+    assert again.get_data() == first.get_data()
+    assert counter.count == 0
+
+    not_modified = client.get(f"/api/tests/{test_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+
+def test_admin_changes_invalidate_cache(client, app):
+    register(client)
+    test_id = make_test(1, 1)
+    etag = client.get(f"/api/tests/{test_id}").headers["ETag"]
+    listing = client.get("/api/tests").get_json()
+
+    question_id = Question.query.filter_by(test_id=test_id).first().id
+    client.post(f"/admin/question/{question_id}/add_option", data={"option_text": "Новый", "score": "3"})
+    resp = client.get(f"/api/tests/{test_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.get_json()["questions"][0]["options"]) == 2
+
+    client.get(f"/admin/test/{test_id}/delete")
+    assert client.get(f"/api/tests/{test_id}").status_code == 404
+    assert len(client.get("/api/tests").get_json()["tests"]) == len(listing["tests"]) - 1
+
+
+def test_user_results_keyset_pagination(client, app):
+    register(client)
+    user = User.query.filter_by(username="admin").first()
+    test_id = make_test(1, 1)
+    base = datetime(2024, 6, 1, 12, 0, 0)
+    # Две пары результатов с одинаковым временем проверяют сортировку по id
+    for i in range(7):
+        db.session.add(Result(user_id=user.id, test_id=test_id, result_text=f"r{i}",
+                              timestamp=base + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = f"/api/user/{user.id}/results?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        with QueryCounter(db.engine) as counter:
+            data = client.get(url).get_json()
+        assert counter.count <= 3
+        seen.extend(r["result"] for r in data["results"])
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == [f"r{i}" for i in reversed(range(7))]
+    assert data["results"][-1]["test_title"] == "Test 1"
+    assert client.get(f"/api/user/{user.id}/results?cursor=bad").status_code == 400
@@ -50,3 +50,219 @@ def test_login_success(client, app):
     assert resp.status_code == 302
     with app.test_request_context():
         assert resp.headers["Location"].endswith(url_for("main.index"))
+
+
+class FastHashConfig(TestConfig):
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    LOGIN_FAILURE_BURST = 3
+    LOGIN_FAILURES_PER_MINUTE = 1
+
+
+@pytest.fixture
+def fast_app():
+    app = create_app(FastHashConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def login(client, username="testuser", password="password123", addr="10.0.0.1"):
+    return client.post(
+        "/login",
+        data={"username": username, "password": password},
+        environ_base={"REMOTE_ADDR": addr},
+    )
+
+
+def test_password_hash_uses_configured_method(fast_app):
+    from app.models import User
+
+    client = fast_app.test_client()
+    register(client)
+    user = User.query.filter_by(username="testuser").first()
+    assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+
+
+def test_login_rehashes_outdated_hash(fast_app):
+    from werkzeug.security import generate_password_hash
+    from app.models import User
+
+    client = fast_app.test_client()
+    register(client)
+    client.get("/logout")
+    user = User.query.filter_by(username="testuser").first()
+    user.password_hash = generate_password_hash("password123", "pbkdf2:sha256:2000", 8)
+    db.session.commit()
+
+    assert login(client).status_code == 302
+    db.session.expire_all()
+    assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+    assert user.check_password("password123")
+
+
+def test_failed_logins_are_rate_limited(fast_app):
+    client = fast_app.test_client()
+    register(client)
+    client.get("/logout")
+    for _ in range(3):
+        assert login(client, password="wrong").status_code == 200
+    resp = login(client)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) > 0
+
+    # Другой логин с того же адреса тоже ограничен, а с другого адреса — нет
+    assert login(client, username="other", addr="10.0.0.1").status_code == 429
+    assert login(client, username="other", addr="10.0.0.2").status_code == 200
+
+
+def test_login_limiter_refills():
+    from app.security import LoginLimiter
+
+    now = [0.0]
+    limiter = LoginLimiter(burst=2, per_minute=6, clock=lambda: now[0])
+    keys = [("ip", "1.2.3.4")]
+    limiter.fail(keys)
+    limiter.fail(keys)
+    assert limiter.retry_after(keys) == pytest.approx(10)
+    now[0] = 10
+    assert limiter.retry_after(keys) == 0
+
+
+def test_hashing_pool_rejects_when_full():
+    import threading
+    from app.security import HashingBusy, PasswordHasher
+
+    hasher = PasswordHasher(workers=1, queue=0, timeout=0.05)
+    release = threading.Event()
+    blocked = hasher._submit(release.wait)
+    with pytest.raises(HashingBusy):
+        hasher.verify("pbkdf2:sha256:1000$salt$00", "x")
+    release.set()
+    blocked.result(1)
+
+
+def test_submit_verify_returns_future(fast_app):
+    import asyncio
+    from app.security import submit_hash, submit_verify
+
+    pwhash = submit_hash("secret").result(5)
+    assert pwhash.startswith("pbkdf2:sha256:1000$")
+
+    async def check():
+        # Ожидание без блокировки цикла событий
+        return await asyncio.wrap_future(submit_verify(pwhash, "secret"))
+
+    assert asyncio.run(check()) is True
+    assert submit_verify(pwhash, "wrong").result(5) is False
+
+
+def test_login_is_case_insensitive_and_single_query(app, client):
+    from sqlalchemy import event
+
+    register(client)
+    client.get("/logout")
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        resp = client.post("/login", data={"username": "TEST@Example.com", "password": "password123"})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert resp.status_code == 302
+    assert len(statements) == 1
+
+
+def test_register_rejects_case_variant_and_only_first_is_admin(app, client):
+    from app.models import User
+
+    register(client)
+    client.get("/logout")
+    register(client, username="TestUser", email="other@example.com")
+    assert User.query.count() == 1
+
+    register(client, username="second", email="second@example.com")
+    admins = {u.username: u.is_admin for u in User.query.all()}
+    assert admins == {"testuser": True, "second": False}
+
+
+def test_concurrent_first_registrations_make_one_admin(tmp_path):
+    # Гарантия держится на последовательных записях SQLite (см. auth.register)
+    import threading
+    from app.models import User
+
+    config = type("FileConfig", (FastHashConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+    })
+    app = create_app(config)
+    count = 8
+    start = threading.Barrier(count)
+    statuses = []
+
+    def sign_up(n):
+        client = app.test_client()
+        start.wait()
+        resp = client.post("/register", data={
+            "username": f"user{n}", "email": f"user{n}@example.com",
+            "password": "password123", "confirm": "password123",
+            "birth_date": "2000-01-01", "is_student": "0",
+        })
+        statuses.append(resp.status_code)
+
+    threads = [threading.Thread(target=sign_up, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        assert statuses == [302] * count
+        assert User.query.count() == count
+        assert User.query.filter_by(is_admin=True).count() == 1
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_rehash_is_skipped_when_pool_is_full(fast_app):
+    import threading
+    from werkzeug.security import generate_password_hash
+    from app.models import User
+    from app.security import HashingBusy
+
+    client = fast_app.test_client()
+    register(client)
+    client.get("/logout")
+    user = User.query.filter_by(username="testuser").first()
+    old_hash = generate_password_hash("password123", "pbkdf2:sha256:2000", 8)
+    user.password_hash = old_hash
+    db.session.commit()
+
+    hasher = fast_app.extensions["password_hasher"]
+    release = threading.Event()
+    blockers = []
+    real_verify = hasher.verify
+
+    def verify_then_fill_pool(pwhash, password):
+        valid = real_verify(pwhash, password)
+        # Пул и очередь заняты к моменту пересчета хеша
+        while True:
+            try:
+                blockers.append(hasher._submit(release.wait))
+            except HashingBusy:
+                break
+        return valid
+
+    hasher.verify = verify_then_fill_pool
+    try:
+        resp = login(client)
+    finally:
+        release.set()
+        for future in blockers:
+            future.result(1)
+    assert resp.status_code == 302
+    db.session.expire_all()
+    assert user.password_hash == old_hash
@@ -0,0 +1,232 @@
+import random
+
+import numpy as np
+import pytest
+from app import create_app, db
+from app.config import Config
+from app.calc import (
+    PROGRAM_TABLE,
+    PROGRAM_TABLE_VERSION,
+    parse_subjects,
+    full_subjects,
+    calc_program_score,
+    admission_probability,
+    PROGRAM_INDEX,
+    PROBABILITY_OFFSET,
+    PROBABILITY_WIDTH,
+    PROBABILITY_HIGH,
+    PROBABILITY_MEDIUM,
+)
+from app.ege_programs import EGE_PROGRAMS
+from app.ege_engine import PROGRAM_MATRIX, SUBJECTS, scores_to_matrix
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, username="student", email="student@example.com", password="password123"):
+    return client.post(
+        "/register",
+        data={
+            "username": username,
+            "email": email,
+            "password": password,
+            "confirm": password,
+            "birth_date": "2000-01-01",
+            "is_student": "1",
+            "ege_math": "80",
+            "ege_russian": "85",
+            "ege_physics": "70",
+        },
+        follow_redirects=True,
+    )
+
+
+def test_program_table_matches_source():
+    assert len(PROGRAM_TABLE) == len(EGE_PROGRAMS)
+    for prog, p in zip(PROGRAM_TABLE, EGE_PROGRAMS):
+        assert [list(g) for g in prog.groups] == parse_subjects(p["subjects"])
+        assert prog.row["subjects_full"] == full_subjects(p["subjects"])
+        assert prog.row["code"] == p["code"]
+        assert prog.needed == p["score_2024"]
+    with pytest.raises(TypeError):
+        PROGRAM_TABLE[0].row["cost"] = 0
+
+
+def test_admission_probability():
+    assert admission_probability(200, None) == (None, None)
+    assert admission_probability(300, 200) == (100, "bg-success")
+    assert admission_probability(200, 200) == (50.0, "bg-warning")
+    assert admission_probability(100, 200) == (0, "bg-danger")
+
+
+def test_calculator_renders_user_scores(client):
+    register(client)
+    resp = client.post("/calc/ege_calculator", data={"ege_math": "80", "ege_russian": "85", "ege_informatics": "90"})
+    assert resp.status_code == 200
+    html = resp.get_data(as_text=True)
+    expected = calc_program_score(PROGRAM_TABLE[1].groups, {"math": 80, "russian": 85, "informatics": 90})
+    assert f"<td>{expected}</td>" in html
+    assert PROGRAM_TABLE[1].row["cost_display"] in html
+    # Каталог для пересчета в браузере запрашивается с версией таблицы
+    assert f"/api/calc/programs?v={PROGRAM_TABLE_VERSION}" in html
+
+
+def test_program_matrix_matches_per_pair_loop():
+    rng = random.Random(5)
+    applicants = [{s: rng.randrange(0, 101) for s in SUBJECTS} for _ in range(200)]
+    applicants.append({})
+    result = PROGRAM_MATRIX.evaluate(scores_to_matrix(applicants))
+    assert result["totals"].shape == (len(applicants), len(PROGRAM_TABLE))
+    for i, scores in enumerate(applicants):
+        for j, prog in enumerate(PROGRAM_TABLE):
+            total = calc_program_score(prog.groups, scores)
+            probability, _ = admission_probability(total, prog.needed)
+            assert result["totals"][i, j] == total
+            assert result["eligible"][i, j] == (prog.needed is not None and total >= prog.needed)
+            if probability is None:
+                assert np.isnan(result["probability"][i, j])
+            else:
+                assert result["probability"][i, j] == probability
+
+
+def _reachable_by_scan(scores, subjects=None, max_cost=None):
+    rows = []
+    for prog in PROGRAM_TABLE:
+        if prog.needed is None:
+            continue
+        if subjects is not None and not all(subjects & set(g) for g in prog.groups):
+            continue
+        if max_cost is not None and prog.row["cost"] > max_cost:
+            continue
+        total = calc_program_score(prog.groups, scores)
+        if total >= prog.needed:
+            rows.append((total - prog.needed, prog.row["code"]))
+    return rows
+
+
+def test_program_index_matches_full_scan():
+    rng = random.Random(7)
+    for _ in range(50):
+        scores = {s: rng.randrange(40, 101) for s in SUBJECTS}
+        subjects = set(rng.sample(SUBJECTS, 4))
+        found = PROGRAM_INDEX.reachable(scores, k=1000, subjects=subjects, max_cost=200000)
+        expected = _reachable_by_scan(scores, subjects, 200000)
+        assert sorted((p["margin"], p["code"]) for p in found) == sorted(expected)
+        margins = [p["margin"] for p in found]
+        assert margins == sorted(margins, reverse=True)
+
+
+def test_reachable_endpoint(client):
+    resp = client.get("/api/programs/reachable?math=95&russian=95&informatics=95&k=3&sort=cost")
+    assert resp.status_code == 200
+    programs = resp.get_json()["programs"]
+    assert len(programs) == 3
+    assert [p["cost"] for p in programs] == sorted(p["cost"] for p in programs)
+    assert all(p["user_score"] >= p["score_2024"] for p in programs)
+    assert client.get("/api/programs/reachable?subjects=latin").status_code == 400
+    assert client.get("/api/programs/reachable?sort=name").status_code == 400
+    for query in ("math=abc", "math=80.5", "math=-1", "math=101", "russian="):
+        resp = client.get(f"/api/programs/reachable?{query}")
+        assert resp.status_code == 400, query
+        assert "error" in resp.get_json()
+
+
+def test_calc_programs_endpoint_describes_table(client):
+    resp = client.get("/api/calc/programs")
+    assert resp.status_code == 200
+    assert resp.cache_control.public and resp.cache_control.max_age >= 3600
+    data = resp.get_json()
+    assert [s["key"] for s in data["subjects"]] == list(SUBJECTS)
+    assert len(data["programs"]) == len(PROGRAM_TABLE)
+    assert data["probability"] == {
+        "offset": PROBABILITY_OFFSET, "width": PROBABILITY_WIDTH,
+        "high": PROBABILITY_HIGH, "medium": PROBABILITY_MEDIUM,
+    }
+
+    # Группы из ответа дают тот же балл, что и calc_program_score
+    rng = random.Random(3)
+    scores = {name: rng.randint(0, 100) for name in SUBJECTS}
+    vector = [scores[name] for name in SUBJECTS]
+    best = [max(vector[i] for i in group) for group in data["groups"]]
+    for program, prog in zip(data["programs"], PROGRAM_TABLE):
+        assert program["code"] == prog.row["code"]
+        assert program["score_2024"] == prog.needed
+        assert sum(best[g] for g in program["groups"]) == calc_program_score(prog.groups, scores)
+
+    again = client.get("/api/calc/programs", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_calc_score_endpoint_matches_calculator(client):
+    scores = {"math": 80, "russian": 75, "physics": 70, "informatics": 90}
+    by_query = client.get("/api/calc/score", query_string=scores).get_json()
+    by_json = client.post("/api/calc/score", json={"scores": scores}).get_json()
+    vector = [scores.get(name, 0) for name in SUBJECTS]
+    by_vector = client.post("/api/calc/score", json={"vector": vector}).get_json()
+    assert by_query == by_json == by_vector
+
+    full = {name: scores.get(name, 0) for name in SUBJECTS}
+    for i, prog in enumerate(PROGRAM_TABLE):
+        total = calc_program_score(prog.groups, full)
+        probability, _ = admission_probability(total, prog.needed)
+        assert by_query["totals"][i] == total
+        assert by_query["eligible"][i] == (prog.needed is not None and total >= prog.needed)
+        assert by_query["probability"][i] == probability
+
+
+@pytest.mark.parametrize("payload", [
+    {"vector": [1, 2]},
+    {"scores": {"latin": 50}},
+    {"scores": {"math": 101}},
+    {"scores": {"math": "много"}},
+    {"scores": {"math": "80"}},
+    {"scores": {"math": 80.5}},
+    {"scores": {"math": True}},
+    {"scores": {"math": None}},
+    {"scores": [80]},
+    {"vector": [80, 75, 70, 90, 0, 0, 0.5]},
+    {"vector": [80, 75, 70, 90, 0, 0, False]},
+    [80, 75],
+])
+def test_calc_score_rejects_bad_input(client, payload):
+    resp = client.post("/api/calc/score", json=payload)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+@pytest.mark.parametrize("query", [
+    "math=abc",
+    "math=",
+    "math=80.5",
+    "math=-5",
+    "math=101",
+    "latin=50",
+])
+def test_calc_score_rejects_bad_query(client, query):
+    resp = client.get(f"/api/calc/score?{query}")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_calc_score_rejects_non_json_post(client):
+    resp = client.post("/api/calc/score?math=80", data={"math": "80"})
+    assert resp.status_code == 400
@@ -1,7 +1,10 @@
 import pytest
+from sqlalchemy import event
 from app import create_app, db
 from app.config import Config
 from app.models import Test
+from app.career_utils import DOC_PATH, load_structure, sync_career_test
+from app.test_io import export_questions
 
 
 class TestConfig(Config):
@@ -23,3 +26,57 @@ def app():
 def test_ensure_career_test_created(app):
     with app.app_context():
         assert Test.query.filter_by(type="career").count() == 1
+
+
+def test_sync_career_test_materializes_doc(app):
+    test = Test.query.filter_by(type="career").one()
+    questions, _ = load_structure()
+    assert test.source_hash
+    assert export_questions(test.id) == questions
+
+
+def test_sync_career_test_is_idempotent_and_follows_changes(app, tmp_path):
+    test = Test.query.filter_by(type="career").one()
+    question_ids = [q.id for q in test.questions]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    sync_career_test()
+    event.remove(db.engine, "before_cursor_execute", listener)
+    assert not [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+    assert [q.id for q in test.questions] == question_ids
+
+    doc = tmp_path / "structure.md"
+    doc.write_text(DOC_PATH.read_text(encoding="utf-8").replace("Скорее да", "Пожалуй, да"), encoding="utf-8")
+    sync_career_test(doc)
+    exported = export_questions(test.id)
+    assert exported[0]["options"][3]["text"] == "Пожалуй, да"
+
+
+def test_career_test_page_reads_questions_from_db(app):
+    client = app.test_client()
+    client.post("/register", data={
+        "username": "u", "email": "u@example.com", "password": "p", "confirm": "p",
+        "birth_date": "2000-01-01", "is_student": "0",
+    })
+    question = Test.query.filter_by(type="career").one().questions[0]
+    question.text = "Изменённый вопрос"
+    db.session.commit()
+    assert "Изменённый вопрос" in client.get("/career_test").get_data(as_text=True)
+
+
+def test_deleted_career_test_is_restored_from_doc(app):
+    client = app.test_client()
+    client.post("/register", data={
+        "username": "u", "email": "u@example.com", "password": "p", "confirm": "p",
+        "birth_date": "2000-01-01", "is_student": "0",
+    })
+    db.session.delete(Test.query.filter_by(type="career").one())
+    db.session.commit()
+
+    html = client.get("/career_test").get_data(as_text=True)
+    questions, _ = load_structure()
+    assert questions[0]["question"] in html
+    test = Test.query.filter_by(type="career").one()
+    assert test.source_hash and len(test.questions) == len(questions)
@@ -1,108 +1,137 @@
-import json
-import re
-from pathlib import Path
-
-from .calc import parse_subjects, calc_program_score
-
-DOC_PATH = Path(__file__).resolve().parents[1] / "docs" / "career_test_structure.md"
-
-
-def load_structure(path: Path = DOC_PATH):
-    """Load questions and program table from documentation."""
-    text = path.read_text(encoding="utf-8")
-
-    json_match = re.search(r"```json\n(.*?)```", text, re.S)
-    if not json_match:
-        raise ValueError("JSON block not found in documentation")
-    questions = json.loads(json_match.group(1))
-
-    table_match = re.search(r"## Профильные предметы.*?\n((?:\|.*\n)+)", text, re.S)
-    programs = {}
-    if table_match:
-        lines = [ln.strip() for ln in table_match.group(1).strip().splitlines()]
-        for line in lines[2:]:
-            cols = [c.strip() for c in line.strip("|").split("|")]
-            if len(cols) >= 3:
-                name, subjects, score = cols[0], cols[1], cols[2]
-                programs[name] = {
-                    "subjects": subjects,
-                    "score_2024": int(score) if score not in {"—", "-", ""} else None,
-                }
-    return questions, programs
-
-
-def calculate_interest_scores(questions, answers):
-    """Sum weights for each direction based on user's answers.
-
-    Parameters
-    ----------
-    questions : list
-        Question definitions from the structure.
-    answers : dict
-        Mapping question id -> option index (0-based).
-    """
-    totals = {}
-    for q in questions:
-        qid = q["id"]
-        idx = answers.get(qid)
-        if idx is None:
-            continue
-        if not (0 <= idx < len(q["options"])):
-            continue
-        option = q["options"][idx]
-        for direction, weight in option["weights"].items():
-            totals[direction] = totals.get(direction, 0) + weight
-    return totals
-
-
-def order_scores(scores):
-    """Return a list of (direction, score) tuples sorted descending."""
-    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
-
-
-def recommend_program(scores, ege_scores, programs):
-    """Return best matching program considering EGE scores.
-
-    The function first tries to find the highest scoring direction where the
-    user's EGE points meet or exceed the passing score for 2024. If none of the
-    directions satisfy the requirement, it falls back to simply returning the
-    direction with the highest interest score regardless of the passing score.
-    Directions without a published passing score are only considered if no other
-    direction matches the user's points.
-    """
-    if not scores:
-        return None
-
-    ordered = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    best_direction = ordered[0][0]
-
-    for direction, _ in ordered:
-        info = programs.get(direction)
-        if not info:
-            continue
-        needed = info.get("score_2024")
-        if needed is None:
-            # Skip directions without a defined passing score until
-            # all other options are checked
-            continue
-        groups = parse_subjects(info["subjects"])
-        user_score = calc_program_score(groups, ege_scores)
-        if user_score >= needed:
-            return direction
-
-    # If nothing matched including directions without scores, choose the highest
-    # interest direction regardless of passing score
-    return best_direction
-
-
-def ensure_career_test():
-    """Make sure a career test record exists in the database."""
-    from app.models import Test
-    from app import db
-
-    if not Test.query.filter_by(type='career').first():
-        t = Test(title='Профориентационный тест', type='career')
-        db.session.add(t)
-        db.session.commit()
-        return t
-    return Test.query.filter_by(type='career').first()
\ No newline at end of file
+import os
+import random
+
+import numpy as np
+
+from app.career_utils import (
+    DOC_PATH,
+    load_structure,
+    get_structure,
+    structure_cache_info,
+    clear_structure_cache,
+    calculate_interest_scores,
+    order_scores,
+    recommend_program,
+    CompiledQuestions,
+    score_batch,
+)
+
+
+def test_load_structure_parses_questions_and_programs():
+    questions, programs = load_structure()
+    assert len(questions) == 30
+    assert programs["Информатика и вычислительная техника"]["score_2024"] == 245
+    assert programs["Прикладная математика"]["score_2024"] is None
+
+
+def test_calculate_interest_scores_and_order():
+    questions, _ = load_structure()
+    answers = {q["id"]: 4 for q in questions}
+    scores = calculate_interest_scores(questions, answers)
+    ordered = order_scores(scores)
+    assert ordered[0][1] == max(scores.values())
+    assert [s for _, s in ordered] == sorted(scores.values(), reverse=True)
+
+
+def test_recommend_program_falls_back_to_best_direction():
+    _, programs = load_structure()
+    scores = {"Экономика": 10, "Машиностроение": 5}
+    low = {"math": 40, "russian": 40, "physics": 40}
+    high = {"math": 90, "russian": 90, "physics": 90}
+    assert recommend_program(scores, low, programs) == "Экономика"
+    assert recommend_program(scores, high, programs) == "Машиностроение"
+
+
+def test_structure_cache_hits_and_reloads(tmp_path):
+    doc = tmp_path / "structure.md"
+    doc.write_text(DOC_PATH.read_text(encoding="utf-8"), encoding="utf-8")
+    clear_structure_cache()
+
+    first = get_structure(doc)
+    second = get_structure(doc)
+    assert first is second
+    assert structure_cache_info()["hits"] == 1
+    assert structure_cache_info()["misses"] == 1
+
+    text = doc.read_text(encoding="utf-8").replace("| 245 |", "| 250 |")
+    doc.write_text(text, encoding="utf-8")
+    stat = doc.stat()
+    os.utime(doc, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    reloaded = get_structure(doc)
+    assert reloaded is not first
+    assert reloaded[1]["Информатика и вычислительная техника"]["score_2024"] == 250
+    assert structure_cache_info()["misses"] == 2
+
+
+def test_compiled_scores_match_reference():
+    questions, _ = load_structure()
+    compiled = CompiledQuestions(questions)
+    rng = random.Random(0)
+    for _ in range(50):
+        answers = {q["id"]: rng.randrange(len(q["options"])) for q in questions}
+        expected = calculate_interest_scores(questions, answers)
+        assert compiled.score(answers) == expected
+        assert compiled.ordered_scores(answers) == order_scores(expected)
+
+
+def test_compiled_order_matches_reference_on_partial_sheets():
+    questions, _ = load_structure()
+    compiled = CompiledQuestions(questions)
+    rng = random.Random(5)
+    sheets = [{q["id"]: 0} for q in questions]  # один ответ — почти все баллы равны
+    for _ in range(300):
+        answered = rng.sample(questions, rng.randrange(1, 6))
+        sheets.append({q["id"]: rng.randrange(len(q["options"])) for q in answered})
+    for answers in sheets:
+        expected = order_scores(calculate_interest_scores(questions, answers))
+        assert compiled.ordered_scores(answers) == expected
+
+
+def test_compiled_scores_skip_missing_and_invalid_answers():
+    questions, _ = load_structure()
+    compiled = CompiledQuestions(questions)
+    answers = {1: 4, 2: 7, 3: -1, 999: 0}
+    assert compiled.score(answers) == calculate_interest_scores(questions, answers)
+    assert compiled.score({}) == {}
+
+
+def test_compiled_score_matrix_matches_single_scoring():
+    questions, _ = load_structure()
+    compiled = CompiledQuestions(questions)
+    rng = np.random.default_rng(1)
+    matrix = rng.integers(-1, 6, size=(20, len(questions)))
+    totals, present = compiled.score_matrix(matrix)
+    for row, tot, pres in zip(matrix, totals, present):
+        answers = {qid: int(v) for qid, v in zip(compiled.question_ids, row)}
+        expected = calculate_interest_scores(questions, answers)
+        assert {compiled.directions[d]: tot[d].item() for d in np.flatnonzero(pres)} == expected
+
+
+def test_score_batch_matches_reference():
+    questions, programs = load_structure()
+    compiled = CompiledQuestions(questions)
+    rng = random.Random(2)
+    sheets, ege = [], []
+    for _ in range(40):
+        sheets.append([rng.randrange(5) for _ in questions])
+        ege.append({s: rng.randrange(30, 101) for s in ("math", "russian", "physics", "informatics")})
+    # Неполные бланки: равные баллы и порядок первого появления направлений
+    for _ in range(200):
+        answered = rng.sample(range(len(questions)), rng.randrange(1, 6))
+        sheet = [rng.randrange(5) if i in answered else -1 for i in range(len(questions))]
+        sheets.append(sheet if rng.random() < 0.5 else {
+            questions[i]["id"]: sheet[i] for i in answered
+        })
+        ege.append({s: rng.randrange(30, 101) for s in ("math", "russian", "physics", "informatics")})
+    sheets.append({})
+    ege.append({})
+
+    results = score_batch(compiled, programs, sheets, ege)
+    for sheet, points, got in zip(sheets, ege, results):
+        answers = sheet if isinstance(sheet, dict) else {
+            q["id"]: idx for q, idx in zip(questions, sheet) if idx >= 0
+        }
+        scores = calculate_interest_scores(questions, answers)
+        assert got["scores"] == order_scores(scores)
+        assert got["recommended"] == recommend_program(scores, points, programs)
@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db
+from app.config import ProductionConfig, engine_options
+from app.models import User, Test, Result
+
+
+def make_app(tmp_path, **settings):
+    uri = f"sqlite:///{tmp_path / 'app.db'}"
+    config = type("FileConfig", (ProductionConfig,), {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": uri,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(uri),
+        **settings,
+    })
+    return create_app(config)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_engine_options_for_server_databases():
+    options = engine_options("postgresql://localhost/proftest")
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] > 0 and options["max_overflow"] >= 0
+    assert options["pool_recycle"] > 0
+    assert engine_options("sqlite:///app.db") == {}
+
+
+def test_production_profile_sets_sqlite_pragmas(app):
+    with db.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == ProductionConfig.SQLITE_PRAGMAS["busy_timeout"]
+
+
+def write_results_behind_reader(app, threads_count=4, writes=5):
+    """Пишет результаты из нескольких потоков, пока другой клиент держит транзакцию чтения.
+
+    Возвращает исключения писателей и число строк, видимое читателю до и после записей.
+    """
+    with app.app_context():
+        user = User(username="writer", email="writer@example.com", password_hash="-")
+        test = Test(title="Нагрузка", type="knowledge")
+        db.session.add_all([user, test])
+        db.session.commit()
+        user_id, test_id = user.id, test.id
+        path = db.engine.url.database
+
+    # Отдельное соединение, как долгий запрос отчёта: BEGIN + SELECT держит снимок
+    reader = sqlite3.connect(path, isolation_level=None)
+    reader.execute("BEGIN")
+    before = reader.execute("SELECT count(*) FROM results").fetchone()[0]
+
+    errors = []
+    start = threading.Barrier(threads_count)
+
+    def writer(n):
+        with app.app_context():
+            start.wait()
+            try:
+                for i in range(writes):
+                    db.session.add(Result(user_id=user_id, test_id=test_id, result_text=f"{n}:{i}"))
+                    db.session.commit()
+            except Exception as exc:  # pragma: no cover - сообщается в assert
+                errors.append(exc)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    during = reader.execute("SELECT count(*) FROM results").fetchone()[0]
+    reader.execute("COMMIT")
+    reader.close()
+    with app.app_context():
+        db.engine.dispose()
+    return errors, before, during
+
+
+def test_writes_proceed_while_reader_holds_transaction(app):
+    errors, before, during = write_results_behind_reader(app)
+
+    assert errors == []
+    assert before == during == 0  # читатель видит свой снимок
+    assert db.session.scalar(db.select(db.func.count(Result.id))) == 4 * 5
+
+
+def test_rollback_journal_blocks_writers_behind_reader(tmp_path):
+    # Контроль сценария: без WAL писатель не может зафиксировать изменения,
+    # пока открыта транзакция чтения, и получает "database is locked"
+    app = make_app(tmp_path, SQLITE_PRAGMAS={"busy_timeout": 100, "journal_mode": "DELETE"})
+
+    errors, _, _ = write_results_behind_reader(app)
+
+    assert errors and all(isinstance(exc, OperationalError) for exc in errors)
+    assert "locked" in str(errors[0])
@@ -0,0 +1,103 @@
+import pytest
+from jinja2 import Environment
+from app import create_app, db
+from app.config import Config
+from app.fragment_cache import FragmentCacheExtension, MemoryFragmentCache
+from app.models import Test
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+
+
+class RecordingCache(MemoryFragmentCache):
+    instances = []
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.instances.append(self)
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def render(env, **context):
+    return env.from_string(
+        "{% for x in items %}{% cache 'item', version, loop.index0 %}<{{ x }}>{% endcache %}{% endfor %}"
+    ).render(**context)
+
+
+def test_cache_tag_reuses_fragments_per_key():
+    env = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    env.fragment_cache = MemoryFragmentCache()
+    assert render(env, items=["a", "b"], version=1) == "<a><b>"
+    # Ключ тот же — фрагменты берутся из кэша, даже если данные другие
+    assert render(env, items=["c", "d"], version=1) == "<a><b>"
+    assert render(env, items=["c", "d"], version=2) == "<c><d>"
+    assert env.fragment_cache.hits == 2
+
+
+def test_cache_tag_escapes_once():
+    env = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    env.fragment_cache = MemoryFragmentCache()
+    for _ in range(2):
+        assert render(env, items=["<b>"], version=1) == "<&lt;b&gt;>"
+
+
+def test_null_backend_renders_every_time():
+    env = Environment(extensions=[FragmentCacheExtension])
+    assert render(env, items=["a"], version=1) == "<a>"
+    assert render(env, items=["b"], version=1) == "<b>"
+
+
+def test_backend_from_import_string():
+    class CustomConfig(TestConfig):
+        FRAGMENT_CACHE_BACKEND = "tests.test_fragment_cache:RecordingCache"
+        FRAGMENT_CACHE_SIZE = 7
+
+    app = create_app(CustomConfig)
+    assert app.jinja_env.fragment_cache is RecordingCache.instances[-1]
+    assert app.jinja_env.fragment_cache.maxsize == 7
+
+
+def test_index_cards_follow_test_changes(app):
+    client = app.test_client()
+    client.post("/register", data={
+        "username": "user", "email": "user@example.com", "password": "pw", "confirm": "pw",
+        "birth_date": "2000-01-01", "is_student": "0",
+    })
+    test = Test(title="Старое название", type="knowledge")
+    db.session.add(test)
+    db.session.commit()
+    assert "Старое название" in client.get("/").get_data(as_text=True)
+
+    test.title = "Новое название"
+    db.session.commit()
+    page = client.get("/").get_data(as_text=True)
+    assert "Новое название" in page
+    assert "Старое название" not in page
+
+
+def test_calculator_keeps_user_cells_out_of_cache(app):
+    client = app.test_client()
+    client.post("/register", data={
+        "username": "user", "email": "user@example.com", "password": "pw", "confirm": "pw",
+        "birth_date": "2000-01-01", "is_student": "0",
+    })
+    low = client.post("/calc/ege_calculator", data={"ege_math": "0"}).get_data(as_text=True)
+    high = client.post("/calc/ege_calculator", data={
+        "ege_math": "100", "ege_russian": "100", "ege_physics": "100", "ege_informatics": "100",
+    }).get_data(as_text=True)
+    assert 'class="table-success"' not in low
+    assert 'class="table-success"' in high
+    assert "<td>300</td>" in high and "<td>300</td>" not in low
+    assert len(app.jinja_env.fragment_cache) > 0
@@ -0,0 +1,32 @@
+import asyncio
+
+from tools.loadtest import percentile, run_load, start_server
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 95) == 7
+    assert percentile([], 50) == 0.0
+
+
+def test_load_run_covers_the_whole_flow(tmp_path):
+    server = start_server(f"sqlite:///{tmp_path / 'load.db'}")
+    try:
+        report = asyncio.run(run_load("127.0.0.1", server.server_port, users=2, concurrency=2, think_time=0))
+    finally:
+        server.shutdown()
+
+    assert report["failed_users"] == []
+    assert set(report["routes"]) == {
+        "POST /register",
+        "POST /login",
+        "GET /career_test",
+        "POST /career_test",
+        "GET /result/<id>",
+        "GET /calc/ege_calculator",
+        "POST /calc/ege_calculator",
+    }
+    assert all(route["requests"] == 2 and route["errors"] == 0 for route in report["routes"].values())
+    assert report["total"]["requests"] == 14
@@ -0,0 +1,198 @@
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.config import Config
+from app.models import User, Test, Result, CareerScore
+from app.migrations import upgrade_schema
+from app.career_store import save_career_result, load_career_data, backfill_career_scores
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def query_plan(query):
+    compiled = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_latest_result_query_uses_index(app):
+    plan = query_plan(
+        Result.query.filter_by(user_id=1, test_id=1).order_by(Result.timestamp.desc())
+    )
+    assert "USING INDEX ix_results_user_test_timestamp" in plan
+    assert "SCAN results" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_profile_query_uses_index(app):
+    plan = query_plan(
+        Result.query.filter_by(user_id=1).order_by(Result.timestamp.desc(), Result.id.desc())
+    )
+    assert "USING INDEX ix_results_user_timestamp" in plan
+    assert "SCAN results" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_login_lookup_uses_lower_indexes(app):
+    login = db.func.lower("Student@Example.com")
+    plan = query_plan(User.query.filter(
+        (db.func.lower(User.username) == login) | (db.func.lower(User.email) == login)
+    ))
+    assert "ix_users_username_lower" in plan
+    assert "ix_users_email_lower" in plan
+    assert "SCAN users" not in plan
+
+
+def test_upgrade_schema_keeps_expression_indexes(app):
+    db.session.execute(text("DROP INDEX ix_users_email_lower"))
+    db.session.commit()
+    upgrade_schema()
+    upgrade_schema()
+    names = {row[1] for row in db.session.execute(text("PRAGMA index_list(users)"))}
+    assert {"ix_users_username_lower", "ix_users_email_lower"} <= names
+
+
+def test_case_variant_usernames_are_rejected_by_database(app):
+    from sqlalchemy.exc import IntegrityError
+
+    db.session.add(User(username="Bob", email="bob@example.com", password_hash="-"))
+    db.session.commit()
+    db.session.add(User(username="bob", email="other@example.com", password_hash="-"))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_upgrade_schema_makes_lower_indexes_unique(app):
+    # База, созданная с неуникальным индексом
+    db.session.execute(text("DROP INDEX ix_users_username_lower"))
+    db.session.execute(text("CREATE INDEX ix_users_username_lower ON users (lower(username))"))
+    db.session.commit()
+    upgrade_schema()
+    unique = {row[1]: row[2] for row in db.session.execute(text("PRAGMA index_list(users)"))}
+    assert unique["ix_users_username_lower"] == 1
+
+
+def test_upgrade_schema_reports_case_variant_duplicates(app, caplog):
+    db.session.execute(text("DROP INDEX ix_users_email_lower"))
+    db.session.execute(text("CREATE INDEX ix_users_email_lower ON users (lower(email))"))
+    db.session.add_all([
+        User(username="bob", email="Bob@example.com", password_hash="-"),
+        User(username="bob2", email="bob@example.com", password_hash="-"),
+    ])
+    db.session.commit()
+
+    upgrade_schema()
+
+    unique = {row[1]: row[2] for row in db.session.execute(text("PRAGMA index_list(users)"))}
+    assert unique["ix_users_email_lower"] == 0
+    assert "ix_users_email_lower" in caplog.text
+    assert "'bob@example.com'" in caplog.text
+
+
+def test_upgrade_schema_adds_missing_indexes(app):
+    db.session.execute(text("DROP INDEX ix_results_user_timestamp"))
+    db.session.commit()
+    upgrade_schema()
+    upgrade_schema()
+    names = {ix["name"] for ix in inspect(db.engine).get_indexes("results")}
+    assert {"ix_results_user_timestamp", "ix_results_user_test_timestamp"} <= names
+
+
+def test_upgrade_schema_adds_missing_columns(app):
+    db.session.execute(text("DROP INDEX ix_results_user_timestamp"))
+    db.session.execute(text("DROP INDEX ix_results_user_test_timestamp"))
+    db.session.execute(text("ALTER TABLE results DROP COLUMN recommended_direction"))
+    db.session.commit()
+    upgrade_schema()
+    columns = {col["name"] for col in inspect(db.engine).get_columns("results")}
+    assert "recommended_direction" in columns
+
+
+def test_upgrade_schema_widens_password_hash_column():
+    from sqlalchemy import String
+    from sqlalchemy.dialects import postgresql
+    from app.migrations import _narrow_columns, _widen_column_ddl
+
+    table = User.__table__
+    # Так столбец выглядит в базе, созданной до увеличения длины
+    reflected = {col.name: {"name": col.name, "type": col.type} for col in table.columns}
+    reflected["password_hash"] = {"name": "password_hash", "type": String(128)}
+    assert [col.name for col in _narrow_columns(table, reflected)] == ["password_hash"]
+    assert _widen_column_ddl(postgresql.dialect(), table, table.c.password_hash) == (
+        "ALTER TABLE users ALTER COLUMN password_hash TYPE VARCHAR(256)"
+    )
+    reflected["password_hash"]["type"] = String(256)
+    assert _narrow_columns(table, reflected) == []
+
+
+def make_user():
+    user = User(username="u", email="u@example.com")
+    user.set_password("secret")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_save_and_load_career_result(app):
+    user = make_user()
+    test_id = Test.query.filter_by(type="career").first().id
+    ordered = [("Экономика", 12), ("Менеджмент", 9), ("Машиностроение", 9)]
+    result = save_career_result(user.id, test_id, ordered, "Менеджмент")
+    db.session.commit()
+
+    assert CareerScore.query.filter_by(result_id=result.id).count() == 3
+    data = load_career_data([result])[result.id]
+    assert data == {"recommended": "Менеджмент", "scores": ordered}
+
+
+def test_backfill_converts_json_blobs(app):
+    user = make_user()
+    test_id = Test.query.filter_by(type="career").first().id
+    doc = {"recommended": "Экономика", "scores": [["Экономика", 10], ["Менеджмент", 4]]}
+    for text_value in (json.dumps(doc, ensure_ascii=False), "not json"):
+        db.session.add(Result(user_id=user.id, test_id=test_id, result_text=text_value))
+    db.session.commit()
+
+    assert backfill_career_scores(chunk_size=1) == 1
+    assert backfill_career_scores() == 0
+    converted = Result.query.filter_by(recommended_direction="Экономика").one()
+    assert load_career_data([converted])[converted.id]["scores"] == [("Экономика", 10), ("Менеджмент", 4)]
+
+
+def test_get_direction_ids_tolerates_concurrent_insert(app):
+    from sqlalchemy import event
+    from app.database import get_direction_ids
+
+    # Другая транзакция добавляет то же направление между SELECT и INSERT
+    pending = ["Новое направление"]
+
+    def concurrent_insert(conn, cursor, statement, parameters, context, executemany):
+        if pending and statement.lstrip().upper().startswith("INSERT INTO DIRECTIONS"):
+            cursor.execute("INSERT INTO directions (name) VALUES (?)", (pending.pop(),))
+
+    event.listen(db.engine, "before_cursor_execute", concurrent_insert)
+    try:
+        ids = get_direction_ids(["Новое направление", "Еще одно"])
+        db.session.commit()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", concurrent_insert)
+
+    stored = dict(db.session.execute(text("SELECT name, id FROM directions")).all())
+    assert ids == {name: stored[name] for name in ("Новое направление", "Еще одно")}
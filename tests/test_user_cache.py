@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import Config
+from app.models import User
+from app.user_cache import UserCache, get_user_cache, invalidate_user
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    WTF_CSRF_ENABLED = False
+    USER_CACHE_TTL = 60
+
+
+@pytest.fixture
+def app():
+    # Контекст приложения не удерживается: каждый запрос получает свою сессию,
+    # как на сервере
+    app = create_app(TestConfig)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/register",
+        data={
+            "username": "student",
+            "email": "student@example.com",
+            "password": "password123",
+            "confirm": "password123",
+            "birth_date": "2005-01-01",
+            "is_student": "1",
+            "ege_math": "80",
+        },
+    )
+    return client
+
+
+@pytest.fixture
+def user_queries(app):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_cache_expires_and_evicts():
+    now = [0.0]
+    cache = UserCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    assert cache.get(1) == {"id": 1}
+    cache.set(3, {"id": 3})  # вытесняет 2 — самый давний по использованию
+    assert cache.get(2) is None
+    now[0] = 11
+    assert cache.get(1) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["expired"] == 1
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_authenticated_requests_skip_users_table(client, user_queries, app):
+    assert client.get("/calc/ege_calculator").status_code == 200
+    assert len(user_queries) == 1
+    resp = client.get("/calc/ege_calculator")
+    assert resp.status_code == 200
+    assert 'value="80"' in resp.get_data(as_text=True)
+    assert len(user_queries) == 1
+    assert get_user_cache(app).stats()["hits"] == 1
+
+
+def test_committed_user_change_invalidates(client, user_queries, app):
+    client.get("/calc/ege_calculator")
+    with app.app_context():
+        user = User.query.filter_by(username="student").first()
+        user.ege_math = 95
+        db.session.commit()
+    queries = len(user_queries)
+    resp = client.get("/calc/ege_calculator")
+    assert 'value="95"' in resp.get_data(as_text=True)
+    assert len(user_queries) == queries + 1
+
+
+def test_explicit_invalidation_after_bulk_update(client, app):
+    client.get("/calc/ege_calculator")
+    with app.app_context():
+        db.session.execute(db.update(User).values(ege_math=70))
+        db.session.commit()
+        invalidate_user()
+    assert 'value="70"' in client.get("/calc/ege_calculator").get_data(as_text=True)
@@ -0,0 +1,377 @@
+"""Load generator simulating applicants taking the career test.
+
+Every virtual user registers, logs in with a fresh session, opens and
+submits ``/career_test``, follows the redirect to ``/result/<id>`` and
+finally uses the EGE calculator. ``--concurrency`` users are active at a
+time; between requests each one waits a random think time (exponentially
+distributed around ``--think-time`` seconds).
+
+By default the application is started in-process on a free local port with
+a temporary SQLite database; ``--database`` points it at another database
+(e.g. a local Postgres) and ``--url`` targets a server that is already
+running. Usage::
+
+    python -m tools.loadtest --users 200 --concurrency 20 --think-time 0.5
+    python -m tools.loadtest --database postgresql://localhost/proftest_load
+    python -m tools.loadtest --url http://127.0.0.1:8000 --json report.json
+
+The client is a small HTTP/1.1 implementation on asyncio streams with
+keep-alive and a per-user cookie jar, so no extra packages are needed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+QUESTION_FIELD = re.compile(r'name="(q_\d+)"[^>]*value="(\d+)"')
+NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+
+class Client:
+    """One keep-alive connection with a cookie jar, used by a single virtual user."""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.cookies = {}
+        self._reader = self._writer = None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(self, method, path, form=None):
+        body = urlencode(form).encode() if form is not None else b""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(body)}",
+        ]
+        if form is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        # Сервер мог закрыть простаивающее соединение: одна повторная попытка
+        for attempt in (1, 2):
+            reused = self._writer is not None
+            if not reused:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, HTTPError):
+                await self.close()
+                if not reused or attempt == 2:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise HTTPError("connection closed before the response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self._reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                self._store_cookie(value)
+            headers[name] = value
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return Response(status, headers, body)
+
+    def _store_cookie(self, header):
+        pair = header.split(";", 1)[0]
+        name, _, value = pair.partition("=")
+        if "max-age=0" in header.lower() or "expires=thu, 01 jan 1970" in header.lower():
+            self.cookies.pop(name.strip(), None)
+        else:
+            self.cookies[name.strip()] = value.strip()
+
+
+class Stats:
+    """Latencies and failures per route label."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, seconds, ok):
+        self.latencies.setdefault(route, []).append(seconds)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, elapsed):
+        routes = {}
+        everything = []
+        for route, values in self.latencies.items():
+            everything.extend(values)
+            routes[route] = summarize(values, self.errors.get(route, 0), elapsed)
+        return {
+            "elapsed": elapsed,
+            "routes": routes,
+            "total": summarize(everything, sum(self.errors.values()), elapsed),
+        }
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values, errors, elapsed):
+    ordered = sorted(values)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+        **{f"p{p}": percentile(ordered, p) for p in (50, 90, 95, 99)},
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+class VirtualUser:
+    def __init__(self, number, client, stats, rng, think_time, run_id):
+        self.number = number
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.username = f"load_{run_id}_{number}"
+        self.password = "load-password"
+
+    async def think(self):
+        if self.think_time > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def call(self, method, path, form=None, expect=(200,)):
+        route = f"{method} {NUMERIC_SEGMENT.sub('/<id>', path.split('?')[0])}"
+        started = time.perf_counter()
+        try:
+            resp = await self.client.request(method, path, form)
+        except (OSError, HTTPError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            self.stats.record(route, time.perf_counter() - started, False)
+            raise
+        ok = resp.status in expect
+        self.stats.record(route, time.perf_counter() - started, ok)
+        if not ok:
+            raise HTTPError(f"{route} returned {resp.status}")
+        return resp
+
+    async def run(self):
+        ege = {subject: str(self.rng.randint(40, 100)) for subject in ("math", "russian", "physics")}
+        await self.call("POST", "/register", {
+            "username": self.username,
+            "email": f"{self.username}@example.com",
+            "password": self.password,
+            "confirm": self.password,
+            "birth_date": "2007-05-01",
+            "is_student": "1",
+            **{f"ege_{subject}": points for subject, points in ege.items()},
+        }, expect=(302,))
+        await self.think()
+
+        # Вход с новой сессией, как при повторном визите
+        self.client.cookies.clear()
+        await self.call("POST", "/login", {"username": self.username, "password": self.password},
+                        expect=(302,))
+        await self.think()
+
+        page = await self.call("GET", "/career_test")
+        options = {}
+        for field, value in QUESTION_FIELD.findall(page.text):
+            options.setdefault(field, []).append(value)
+        if not options:
+            raise HTTPError("no questions found on /career_test")
+        await self.think()
+
+        answers = {field: self.rng.choice(values) for field, values in options.items()}
+        resp = await self.call("POST", "/career_test", answers, expect=(302,))
+        location = urlsplit(resp.headers.get("location", "")).path
+        await self.call("GET", location)
+        await self.think()
+
+        await self.call("GET", "/calc/ege_calculator")
+        await self.think()
+        scores = {f"ege_{subject}": str(self.rng.randint(40, 100))
+                  for subject in ("math", "russian", "physics", "informatics")}
+        await self.call("POST", "/calc/ege_calculator", scores)
+
+
+async def run_load(host, port, users, concurrency, think_time, seed=0, ramp_up=0.0):
+    """Run ``users`` virtual users, ``concurrency`` at a time; return the report dict."""
+    stats = Stats()
+    queue = asyncio.Queue()
+    for number in range(users):
+        queue.put_nowait(number)
+    run_id = f"{int(time.time())}{random.Random(seed).randrange(1000):03d}"
+    failures = []
+
+    async def worker(index):
+        if ramp_up and concurrency > 1:
+            await asyncio.sleep(ramp_up * index / concurrency)
+        while True:
+            try:
+                number = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            client = Client(host, port)
+            user = VirtualUser(number, client, stats, random.Random(seed * 100003 + number),
+                               think_time, run_id)
+            try:
+                await user.run()
+            except (OSError, HTTPError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exc:
+                failures.append(f"user {number}: {exc}")
+            finally:
+                await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(min(concurrency, users))))
+    report = stats.report(time.perf_counter() - started)
+    report["users"] = users
+    report["concurrency"] = concurrency
+    report["failed_users"] = failures
+    return report
+
+
+def start_server(database):
+    """Start the application (production profile) on a free local port in a background thread."""
+    from werkzeug.serving import make_server
+
+    from app import create_app
+    from app.config import ProductionConfig, engine_options
+
+    config = type("LoadTestConfig", (ProductionConfig,), {
+        "SQLALCHEMY_DATABASE_URI": database,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(database),
+    })
+    # Журнал каждого запроса исказил бы замеры и заслонил отчет
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, create_app(config), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def print_report(report):
+    header = f"{'route':<32} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print("-" * len(header))
+
+    def row(name, s):
+        ms = lambda v: f"{v * 1000:.1f}"  # noqa: E731
+        print(f"{name:<32} {s['requests']:>6} {s['errors']:>5} {s['throughput']:>8.1f} "
+              f"{ms(s['p50']):>8} {ms(s['p90']):>8} {ms(s['p95']):>8} {ms(s['p99']):>8} {ms(s['max']):>8}")
+
+    for route, summary in sorted(report["routes"].items()):
+        row(route, summary)
+    print("-" * len(header))
+    row("total", report["total"])
+    print(f"\n{report['users']} users, concurrency {report['concurrency']}, "
+          f"{report['elapsed']:.1f} s; latencies in ms")
+    if report["failed_users"]:
+        print(f"{len(report['failed_users'])} users failed, first: {report['failed_users'][0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="virtual users to run (default: 50)")
+    parser.add_argument("--concurrency", type=int, default=10, help="users active at once (default: 10)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean pause between a user's requests, seconds (default: 0)")
+    parser.add_argument("--ramp-up", type=float, default=0.0,
+                        help="seconds over which the concurrent users are started")
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="test an already running server instead of starting one")
+    target.add_argument("--database", help="database URL for the local server (default: temporary SQLite file)")
+    parser.add_argument("--json", type=Path, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    tmpdir = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        database = args.database
+        if database is None:
+            tmpdir = tempfile.TemporaryDirectory()
+            database = f"sqlite:///{Path(tmpdir.name) / 'loadtest.db'}"
+        server = start_server(database)
+        host, port = "127.0.0.1", server.server_port
+        print(f"serving on http://{host}:{port} with {database}")
+
+    try:
+        report = asyncio.run(run_load(host, port, args.users, args.concurrency,
+                                      args.think_time, args.seed, args.ramp_up))
+    finally:
+        if server is not None:
+            server.shutdown()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())